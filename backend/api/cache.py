@@ -0,0 +1,114 @@
+import hashlib
+import json
+import time
+from urllib.parse import urlencode
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+RECIPE_PAGE_TIMEOUT = 60
+RECIPE_DETAIL_TIMEOUT = 60 * 60 * 24
+
+
+def version_key(model):
+    return f'catalog:{model._meta.label_lower}:version'
+
+
+def get_catalog_version(model):
+    # Версия — время изменения в наносекундах: Last-Modified берётся
+    # из неё же, и после вытеснения ключа версия не повторяется.
+    version = cache.get(version_key(model))
+    if version is None:
+        cache.add(version_key(model), time.time_ns(), timeout=None)
+        version = cache.get(version_key(model), time.time_ns())
+    return version, version // 10 ** 9
+
+
+def bump_catalog_version(model):
+    cache.set(version_key(model), time.time_ns(), timeout=None)
+
+
+def make_page_key(prefix, version, request):
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    url = f'{request.build_absolute_uri(request.path)}?{query}'
+    digest = hashlib.md5(url.encode('utf-8')).hexdigest()
+    return f'{prefix}:{version}:{digest}'
+
+
+def recipe_version_key(recipe_id):
+    return f'recipes:detail:{recipe_id}:version'
+
+
+def get_recipe_version(recipe_id, exists):
+    # Версия создаётся только для существующего рецепта, чтобы запросы
+    # к произвольным id не заполняли кеш.
+    key = recipe_version_key(recipe_id)
+    version = cache.get(key)
+    if version is None:
+        if not exists():
+            return None
+        version = uuid4().hex
+        cache.add(key, version, timeout=RECIPE_DETAIL_TIMEOUT)
+        version = cache.get(key, version)
+    return version
+
+
+def make_detail_key(recipe_id, version, request):
+    host = hashlib.md5(
+        request.build_absolute_uri('/').encode('utf-8')).hexdigest()
+    return f'recipes:detail:{recipe_id}:{version}:{host}'
+
+
+def invalidate_recipe_details(recipe_ids):
+    cache.delete_many([recipe_version_key(pk) for pk in recipe_ids])
+
+
+def make_etag(data, media_type):
+    content = json.dumps(data, ensure_ascii=False, sort_keys=True,
+                         default=str)
+    return hashlib.md5(
+        f'{media_type}:{content}'.encode('utf-8')).hexdigest()
+
+
+class CatalogCacheMixin:
+    cache_timeout = CATALOG_CACHE_TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def get_cache_key(self, request, version):
+        model = self.get_queryset().model
+        path = hashlib.md5(
+            f'{request.accepted_media_type}:{request.get_full_path()}'
+            .encode('utf-8')).hexdigest()
+        return f'catalog:{model._meta.label_lower}:{version}:{path}'
+
+    def cached_response(self, view, request, *args, **kwargs):
+        version, last_modified = get_catalog_version(
+            self.get_queryset().model)
+        key = self.get_cache_key(request, version)
+        entry = cache.get(key)
+        if entry is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            entry = (response.data, make_etag(
+                response.data, request.accepted_media_type))
+            cache.set(key, entry, timeout=self.cache_timeout)
+        data, etag = entry
+        etag = quote_etag(etag)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -1,20 +1,127 @@
-from django_filters import AllValuesMultipleFilter
+from django import forms
+from django.core.cache import cache
+from django.db.models import Exists, F, OuterRef
 from django_filters import rest_framework as filters
 from django_filters.widgets import BooleanWidget
-from recipes.models import Recipe
-from rest_framework.filters import SearchFilter
+from recipes.models import Cart, Favorite, Recipe, Tag
+from recipes.search import search_recipes
+
+from api.cache import CATALOG_CACHE_TIMEOUT, get_catalog_version
+from api.user_flags import get_user_flags
+
+ORDERINGS = {
+    'popular': (F('favorites_count').desc(), F('pub_date').desc()),
+    'trending': (F('ranking__score').desc(nulls_last=True),
+                 F('pub_date').desc()),
+    'cooking_time': (F('cooking_time').asc(), F('pub_date').desc()),
+}
+
+USER_RECIPES = {
+    'is_favorited': Favorite,
+    'is_in_shopping_cart': Cart,
+}
+USER_RECIPES_ID_LIMIT = 500
+
+TAGS_MATCH = (
+    ('any', 'Хотя бы один из тегов'),
+    ('all', 'Все теги'),
+)
+
+RecipeTags = Recipe.tags.through
+
+
+def get_tag_map():
+    version, _ = get_catalog_version(Tag)
+    key = f'catalog:{Tag._meta.label_lower}:{version}:map'
+    tag_map = cache.get(key)
+    if tag_map is None:
+        tag_map = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tag_map, timeout=CATALOG_CACHE_TIMEOUT)
+    return tag_map
+
+
+def tag_choices():
+    return [(slug, slug) for slug in get_tag_map()]
+
+
+class IntegerListField(forms.Field):
+    widget = forms.SelectMultiple
+
+    def to_python(self, value):
+        if not value:
+            return []
+        try:
+            return [int(item) for item in value]
+        except (TypeError, ValueError):
+            raise forms.ValidationError(
+                'Укажите целые числа.', code='invalid')
+
+
+class IntegerInFilter(filters.Filter):
+    field_class = IntegerListField
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('lookup_expr', 'in')
+        super().__init__(*args, **kwargs)
 
 
 class TagFavoritShopingFilter(filters.FilterSet):
-    is_in_shopping_cart = filters.BooleanFilter(widget=BooleanWidget())
-    is_favorited = filters.BooleanFilter(widget=BooleanWidget())
-    tags = AllValuesMultipleFilter(field_name="tags__slug")
-    author = AllValuesMultipleFilter(field_name="author__id")
+    is_in_shopping_cart = filters.BooleanFilter(
+        widget=BooleanWidget(), method='filter_user_recipes')
+    is_favorited = filters.BooleanFilter(
+        widget=BooleanWidget(), method='filter_user_recipes')
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices, method='filter_tags')
+    tags_match = filters.ChoiceFilter(
+        choices=TAGS_MATCH, method='filter_tags_match')
+    author = IntegerInFilter(field_name='author_id')
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.ChoiceFilter(
+        choices=[(name, name) for name in ORDERINGS],
+        method='filter_ordering')
 
     class Meta:
         model = Recipe
-        fields = ["author__id", "tags__slug", "is_favorited", "is_in_shopping_cart"]
+        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+
+    def filter_user_recipes(self, queryset, name, value):
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.none() if value else queryset
+        model = USER_RECIPES[name]
+        if not value:
+            return queryset.exclude(Exists(model.objects.filter(
+                user=user, recipe=OuterRef('pk'))))
+        # Выборка начинается с записей пользователя, а не со всех
+        # рецептов: небольшое множество id берётся из кеша флагов,
+        # большое — полусоединением с его записями избранного/корзины.
+        recipe_ids = get_user_flags(user)[name]
+        if len(recipe_ids) <= USER_RECIPES_ID_LIMIT:
+            return queryset.filter(id__in=recipe_ids)
+        return queryset.filter(id__in=model.objects.filter(
+            user=user).values('recipe_id'))
+
+    def filter_tags(self, queryset, name, value):
+        # Каждое условие — полусоединение с таблицей связей, поэтому
+        # рецепт с несколькими тегами не дублируется и DISTINCT не нужен.
+        tag_map = get_tag_map()
+        tag_ids = [tag_map[slug] for slug in value]
+        if self.form.cleaned_data.get('tags_match') != 'all':
+            return queryset.filter(Exists(RecipeTags.objects.filter(
+                recipe_id=OuterRef('pk'), tag_id__in=tag_ids)))
+        for tag_id in tag_ids:
+            queryset = queryset.filter(Exists(RecipeTags.objects.filter(
+                recipe_id=OuterRef('pk'), tag_id=tag_id)))
+        return queryset
+
+    def filter_tags_match(self, queryset, name, value):
+        # Режим учитывается в filter_tags.
+        return queryset
 
+    def filter_search(self, queryset, name, value):
+        # Результаты упорядочены по релевантности, явный ?ordering=
+        # применяется после и имеет приоритет.
+        return search_recipes(queryset, value)
 
-class IngredientSearchFilter(SearchFilter):
-    search_param = 'name'
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*ORDERINGS[value], F('id').desc())
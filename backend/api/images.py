@@ -0,0 +1,115 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from api.signals import invalidate_recipes
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+IMAGE_DIR = 'recipe_images'
+VARIANTS = {
+    'thumbnail': (320, 'JPEG'),
+    'thumbnail_webp': (320, 'WEBP'),
+    'medium': (960, 'JPEG'),
+    'medium_webp': (960, 'WEBP'),
+    'webp': (None, 'WEBP'),
+}
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+executor = ThreadPoolExecutor(
+    max_workers=max(settings.IMAGE_PIPELINE_WORKERS, 1),
+    thread_name_prefix='images')
+
+
+def store_original(content, extension):
+    # Имя файла — хеш содержимого, поэтому одинаковые картинки
+    # хранятся один раз, а варианты генерируются для них однажды.
+    digest = hashlib.sha256(content).hexdigest()
+    name = f'{IMAGE_DIR}/{digest[:2]}/{digest}.{extension}'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(content))
+    return name
+
+
+def variant_names(name):
+    root, _ = os.path.splitext(name)
+    return {
+        variant: f'{root}_{size or "full"}.{EXTENSIONS[image_format]}'
+        for variant, (size, image_format) in VARIANTS.items()
+    }
+
+
+def open_image(name):
+    with default_storage.open(name) as file:
+        image = Image.open(file)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        return image.convert('RGBA')
+    return image.convert('RGB')
+
+
+def encode(image, size, image_format):
+    if size is not None:
+        image = image.copy()
+        image.thumbnail((size, size), Image.LANCZOS)
+    buffer = BytesIO()
+    if image_format == 'WEBP':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+        return buffer.getvalue()
+    if image.mode == 'RGBA':
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True,
+               progressive=True)
+    return buffer.getvalue()
+
+
+def render_variants(name):
+    names = variant_names(name)
+    missing = [variant for variant, variant_name in names.items()
+               if not default_storage.exists(variant_name)]
+    if missing:
+        image = open_image(name)
+        for variant in missing:
+            default_storage.save(names[variant], ContentFile(
+                encode(image, *VARIANTS[variant])))
+    return names
+
+
+def process_image(name):
+    try:
+        variants = render_variants(name)
+    except Exception:
+        logger.exception('Не удалось обработать картинку %s', name)
+        return
+    recipes = Recipe.objects.filter(image=name)
+    recipe_ids = list(recipes.values_list('id', flat=True))
+    recipes.update(image_variants=variants)
+    invalidate_recipes(recipe_ids)
+
+
+def process_in_worker(name):
+    try:
+        process_image(name)
+    finally:
+        connections.close_all()
+
+
+def schedule_variants(name):
+    if not settings.IMAGE_PIPELINE_WORKERS:
+        transaction.on_commit(lambda: process_image(name))
+        return
+    transaction.on_commit(lambda: executor.submit(process_in_worker, name))
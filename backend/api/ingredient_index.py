@@ -0,0 +1,51 @@
+from bisect import bisect_left, bisect_right
+from threading import Lock
+
+from api.cache import get_catalog_version
+from recipes.models import Ingredient
+
+SEARCH_LIMIT = 50
+
+
+class IngredientIndex:
+    def __init__(self):
+        self.lock = Lock()
+        self.version = None
+        self.entries = ([], [])
+
+    def build(self):
+        rows = Ingredient.objects.values('id', 'name', 'measurement_unit')
+        entries = sorted(
+            ((row['name'].casefold(), row['id']), row) for row in rows)
+        # Ключи и строки публикуются одним присваиванием, чтобы поиск
+        # без блокировки не видел ключи одной версии и строки другой.
+        self.entries = (
+            [key for (key, _), _ in entries],
+            [row for _, row in entries],
+        )
+
+    def refresh(self):
+        version = get_catalog_version(Ingredient)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.build()
+                    self.version = version
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        self.refresh()
+        keys, items = self.entries
+        query = query.casefold()
+        start = bisect_left(keys, query)
+        end = bisect_right(keys, query + '\U0010ffff', lo=start)
+        result = items[start:min(end, start + limit)]
+        if len(result) < limit:
+            for key, item in zip(keys, items):
+                if query in key and not key.startswith(query):
+                    result.append(item)
+                    if len(result) == limit:
+                        break
+        return result
+
+
+ingredient_index = IngredientIndex()
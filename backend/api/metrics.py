@@ -0,0 +1,127 @@
+import logging
+import time
+from collections import defaultdict
+from threading import Lock
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+METRICS = (
+    ('requests_total', 'Число запросов'),
+    ('db_queries_total', 'Число SQL-запросов'),
+    ('db_seconds_total', 'Время выполнения SQL-запросов'),
+    ('serialization_seconds_total',
+     'Время сериализации и рендеринга ответа вне базы данных'),
+    ('response_bytes_total', 'Размер ответов'),
+    ('budget_exceeded_total', 'Число превышений бюджета запросов'),
+)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = Lock()
+        self.values = defaultdict(lambda: defaultdict(float))
+
+    def record(self, action, **values):
+        with self.lock:
+            counters = self.values[action]
+            counters['requests_total'] += 1
+            for name, value in values.items():
+                counters[name] += value
+
+    def render(self):
+        with self.lock:
+            values = {key: dict(value) for key, value in self.values.items()}
+        lines = []
+        for name, description in METRICS:
+            lines.append(f'# HELP foodgram_{name} {description}')
+            lines.append(f'# TYPE foodgram_{name} counter')
+            for (view, action), counters in sorted(values.items()):
+                lines.append(
+                    f'foodgram_{name}{{view="{view}",action="{action}"}} '
+                    f'{counters.get(name, 0):g}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class QueryMetricsMixin:
+    def initial(self, request, *args, **kwargs):
+        request._request.metrics_action = (type(self).__name__, self.action)
+        super().initial(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        stats = getattr(request._request, 'query_stats', None)
+        if stats is not None:
+            request._request.metrics_view_end = (
+                time.perf_counter(), stats.duration)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class QueryMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        request.query_stats = stats
+        start = time.perf_counter()
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        end = time.perf_counter()
+        action = getattr(request, 'metrics_action', None)
+        if action is None:
+            return response
+        view_end, view_db = getattr(
+            request, 'metrics_view_end', (end, stats.duration))
+        app = max(view_end - start - view_db, 0)
+        render = max(end - view_end - (stats.duration - view_db), 0)
+        size = 0 if response.streaming else len(response.content)
+        response['Server-Timing'] = (
+            f'db;dur={stats.duration * 1000:.1f};'
+            f'desc="{stats.count} queries", '
+            f'app;dur={app * 1000:.1f}, render;dur={render * 1000:.1f}, '
+            f'total;dur={(end - start) * 1000:.1f}'
+        )
+        exceeded = self.check_budget(action, stats.count)
+        registry.record(
+            action,
+            db_queries_total=stats.count,
+            db_seconds_total=stats.duration,
+            serialization_seconds_total=app + render,
+            response_bytes_total=size,
+            budget_exceeded_total=int(exceeded),
+        )
+        return response
+
+    def check_budget(self, action, count):
+        name = '.'.join(str(part) for part in action)
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(name)
+        if budget is None or count <= budget:
+            return False
+        message = f'{name}: {count} SQL-запросов при бюджете {budget}'
+        if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+        return True
@@ -1,6 +1,171 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       PageNumberPagination)
+
+APPROXIMATE_COUNT_THRESHOLD = 100000
+COUNT_CACHE_TIMEOUT = 60
+
+
+def estimate_count(queryset):
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+            [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    return row[0] if row else -1
+
+
+class CachedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        vendor = connections[queryset.db].vendor
+        if not queryset.query.where and vendor == 'postgresql':
+            estimate = estimate_count(queryset)
+            if estimate >= APPROXIMATE_COUNT_THRESHOLD:
+                return estimate
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        key = 'count:' + hashlib.md5(
+            f'{sql}:{params}'.encode('utf-8')).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, timeout=COUNT_CACHE_TIMEOUT)
+        return count
+
+
+class LimitCursorPagination(CursorPagination):
+    page_size = 6
+    page_size_query_param = 'limit'
+    ordering = '-id'
+
+
+class KeysetCursorPagination(LimitCursorPagination):
+    # Позиция курсора — дата публикации и id крайней записи страницы:
+    # при равных датах страницы не перекрываются и не требуют смещения.
+    ordering = ('-pub_date', '-id')
+    has_next = False
+    has_previous = False
+    next_position = None
+    previous_position = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        cursor = self.decode_cursor(request)
+        if cursor and cursor.position is None:
+            cursor = None
+        reverse = bool(cursor and cursor.reverse)
+        if cursor:
+            pub_date, pk = self.parse_position(cursor.position)
+            lookup = 'gt' if reverse else 'lt'
+            queryset = queryset.filter(
+                Q(**{f'pub_date__{lookup}': pub_date})
+                | Q(pub_date=pub_date, **{f'id__{lookup}': pk}))
+        ordering = ('pub_date', 'id') if reverse else self.ordering
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+        self.has_next = bool(rows) and (reverse or has_more)
+        self.has_previous = bool(rows) and (
+            has_more if reverse else cursor is not None)
+        if rows:
+            self.previous_position = self.encode_position(
+                rows[0].pub_date, rows[0].pk)
+            self.next_position = self.encode_position(
+                rows[-1].pub_date, rows[-1].pk)
+        return rows
+
+    def encode_position(self, pub_date, pk):
+        return f'{pub_date.isoformat()}|{pk}'
+
+    def parse_position(self, position):
+        try:
+            pub_date, pk = position.split('|')
+            return datetime.fromisoformat(pub_date), int(pk)
+        except (AttributeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=self.previous_position))
+
+
+class RecipeCursorPagination(KeysetCursorPagination):
+    pass
 
 
 class LimitPageNumberPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
+    django_paginator_class = CachedCountPaginator
+    cursor_pagination_class = LimitCursorPagination
+    cursor = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        cursor_class = self.cursor_pagination_class
+        if cursor_class and (
+                cursor_class.cursor_query_param in request.query_params):
+            self.cursor = cursor_class()
+            return self.cursor.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor:
+            return self.cursor.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RecipePagination(LimitPageNumberPagination):
+    cursor_pagination_class = RecipeCursorPagination
+
+
+class PantryPagination(LimitPageNumberPagination):
+    # Совпадения упорядочены по доле имеющихся ингредиентов, а не по
+    # дате публикации, поэтому листаются только по номеру страницы.
+    cursor_pagination_class = None
+
+
+class FeedPagination(KeysetCursorPagination):
+    # Лента собирается не из одного QuerySet, поэтому листать её можно
+    # только вперёд.
+    def paginate_feed(self, request, read):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        before = None
+        if cursor and cursor.position is not None:
+            before = self.parse_position(cursor.position)
+        rows = read(before, self.page_size + 1)
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.has_next:
+            self.next_position = self.encode_position(*rows[-1])
+        return rows
@@ -0,0 +1,140 @@
+import csv
+import json
+from abc import ABC, abstractmethod
+from dataclasses import asdict
+from io import BytesIO
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFError, TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer
+
+
+class ShoppingListRenderer(ABC, BaseRenderer):
+    charset = 'utf-8'
+
+    @property
+    def content_type(self):
+        if self.charset:
+            return f'{self.media_type}; charset={self.charset}'
+        return self.media_type
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b''.join(self.stream(data))
+
+    def stream(self, items):
+        for chunk in self.chunks(items):
+            yield chunk.encode(self.charset)
+
+    @abstractmethod
+    def chunks(self, items):
+        pass
+
+
+class TxtShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def chunks(self, items):
+        for index, item in enumerate(items, start=1):
+            yield (f'{index}. {item.name} - {item.amount} '
+                   f'{item.measurement_unit}\n')
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def chunks(self, items):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('name', 'measurement_unit', 'amount'))
+        for item in items:
+            yield writer.writerow(
+                (item.name, item.measurement_unit, item.amount))
+
+
+class JSONShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def chunks(self, items):
+        separator = '['
+        for item in items:
+            yield separator + json.dumps(asdict(item), ensure_ascii=False)
+            separator = ','
+        yield ']' if separator == ',' else '[]'
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    font_name = 'ShoppingListFont'
+    font_size = 12
+    line_height = 18
+    margin = 50
+    chunk_size = 64 * 1024
+
+    def get_font(self):
+        if self.font_name not in pdfmetrics.getRegisteredFontNames():
+            try:
+                pdfmetrics.registerFont(
+                    TTFont(self.font_name, settings.SHOPPING_LIST_PDF_FONT))
+            except (TTFError, OSError):
+                return 'Helvetica'
+        return self.font_name
+
+    def chunks(self, items):
+        return TxtShoppingListRenderer().chunks(items)
+
+    def stream(self, items):
+        # PDF собирается постранично, поэтому документ формируется
+        # в буфере, а клиенту отдаётся частями.
+        buffer = BytesIO()
+        font = self.get_font()
+        width, height = A4
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        pdf.setFont(font, self.font_size)
+        y = height - self.margin
+        for line in self.chunks(items):
+            if y < self.margin:
+                pdf.showPage()
+                pdf.setFont(font, self.font_size)
+                y = height - self.margin
+            pdf.drawString(self.margin, y, line.rstrip('\n'))
+            y -= self.line_height
+        pdf.save()
+        buffer.seek(0)
+        while True:
+            chunk = buffer.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+SHOPPING_LIST_RENDERERS = (
+    TxtShoppingListRenderer,
+    CSVShoppingListRenderer,
+    JSONShoppingListRenderer,
+    PDFShoppingListRenderer,
+)
+
+
+class ShoppingListNegotiation(DefaultContentNegotiation):
+    # Формат файла задаётся только параметром ?format=, заголовок Accept
+    # не учитывается: иначе клиент получал бы JSON вместо txt.
+    def select_renderer(self, request, renderers, format_suffix=None):
+        format = (
+            format_suffix
+            or request.query_params.get(self.settings.URL_FORMAT_OVERRIDE)
+            or TxtShoppingListRenderer.format)
+        renderer = self.filter_renderers(renderers, format)[0]
+        return renderer, renderer.media_type
@@ -1,15 +1,25 @@
 from django.contrib.auth import get_user_model
-from django.db.models import F
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
+from api.images import VARIANTS, schedule_variants, store_original
+from api.user_flags import EMPTY_FLAGS
+
+from recipes.counters import change_recipes_count  # isort:skip
 from recipes.models import Ingredient, IngredientAmount, Recipe, Tag  # isort:skip
+from recipes.pantry import PANTRY_LIMIT  # isort:skip
+from recipes.search import schedule_search_update  # isort:skip
 from users.models import Follow  # isort:skip
 
 User = get_user_model()
 
+BULK_LIMIT = 100
+
 
 class CustomUserCreateSerializer(UserCreateSerializer):
     email = serializers.EmailField(
@@ -47,10 +57,17 @@ class CustomUserSerializer(UserSerializer):
         read_only_fields = 'is_subscribed',
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return Follow.objects.filter(user=user, author=obj.id).exists()
+        return obj.id in self.get_subscriptions()
+
+    def get_subscriptions(self):
+        if 'subscriptions' not in self.context:
+            user = self.context.get('request').user
+            if user.is_anonymous:
+                self.context['subscriptions'] = frozenset()
+            else:
+                self.context['subscriptions'] = frozenset(
+                    user.follower.values_list('author_id', flat=True))
+        return self.context['subscriptions']
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -65,12 +82,50 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class IngredientAmountSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source='ingredients.id')
+    name = serializers.ReadOnlyField(source='ingredients.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredients.measurement_unit')
+
+    class Meta:
+        model = IngredientAmount
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+
+
+class ImageVariantsField(serializers.Field):
+    def __init__(self, **kwargs):
+        kwargs.update(source='*', read_only=True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return {}
+        request = self.context.get('request')
+        urls = {}
+        for variant in VARIANTS:
+            url = default_storage.url(
+                recipe.image_variants.get(variant, recipe.image.name))
+            urls[variant] = (
+                request.build_absolute_uri(url) if request else url)
+        return urls
+
+
+def prefetch_ingredients():
+    return Prefetch(
+        'ingredient',
+        queryset=IngredientAmount.objects.select_related(
+            'ingredients').order_by('ingredients__name')
+    )
+
+
 class RecipeReadSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True)
     author = CustomUserSerializer()
-    ingredients = serializers.SerializerMethodField()
-    is_favorited = serializers.BooleanField(default=False)
-    is_in_shopping_cart = serializers.BooleanField(default=False)
+    ingredients = IngredientAmountSerializer(source='ingredient', many=True)
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -83,19 +138,24 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
         )
 
-    def get_ingredients(self, obj):
-        return obj.ingredients.values(
-            'id', 'name', 'measurement_unit', amount=F('recipe__amount')
-        )
+    def get_is_favorited(self, obj):
+        return obj.id in self.context.get(
+            'user_flags', EMPTY_FLAGS)['is_favorited']
+
+    def get_is_in_shopping_cart(self, obj):
+        return obj.id in self.context.get(
+            'user_flags', EMPTY_FLAGS)['is_in_shopping_cart']
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
-    ingredients = serializers.SerializerMethodField()
+    ingredients = IngredientAmountSerializer(
+        source='ingredient', many=True, read_only=True)
     image = Base64ImageField()
 
     class Meta:
@@ -109,11 +169,6 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
-    def get_ingredients(self, obj):
-        return obj.ingredients.values(
-            'id', 'name', 'measurement_unit', amount=F('recipe__amount')
-        )
-
     def validate(self, data):
         ingredients = self.initial_data.get('ingredients')
         ingredients_set = set()
@@ -136,42 +191,114 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         data['ingredients'] = ingredients
         return data
 
-    def add_tags_ingredients(self, instance, **validated_data):
-        ingredients = validated_data['ingredients']
-        tags = validated_data['tags']
-        for tag in tags:
-            instance.tags.add(tag)
+    def set_ingredients(self, instance, ingredients, created=False):
+        amounts = {
+            int(ingredient.get('id')): int(ingredient.get('amount'))
+            for ingredient in ingredients
+        }
+        existing = {} if created else {
+            amount.ingredients_id: amount
+            for amount in IngredientAmount.objects.filter(recipe=instance)
+        }
+        removed = [
+            amount.id for ingredient_id, amount in existing.items()
+            if ingredient_id not in amounts
+        ]
+        changed = []
+        for ingredient_id, amount in existing.items():
+            if ingredient_id in amounts and (
+                    amount.amount != amounts[ingredient_id]):
+                amount.amount = amounts[ingredient_id]
+                changed.append(amount)
+        if removed:
+            IngredientAmount.objects.filter(id__in=removed).delete()
+        if changed:
+            IngredientAmount.objects.bulk_update(changed, ['amount'])
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(
+                recipe=instance, ingredients_id=ingredient_id, amount=amount)
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        )
 
-        for ingredient in ingredients:
-            IngredientAmount.objects.create(
-                recipe=instance,
-                ingredients_id=ingredient.get('id'),
-                amount=ingredient.get('amount'))
-        return instance
+    def store_image(self, validated_data):
+        # Файл сохраняется только после успешной валидации всего рецепта.
+        image = validated_data.get('image')
+        if image is not None:
+            image.seek(0)
+            validated_data['image'] = store_original(
+                image.read(), image.name.rsplit('.', 1)[-1])
+
+    def to_representation(self, instance):
+        prefetch_related_objects([instance], 'tags', prefetch_ingredients())
+        return super().to_representation(instance)
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
+        self.store_image(validated_data)
         tags = self.initial_data.get('tags')
+        validated_data['ingredients_count'] = len(ingredients)
         recipe = super().create(validated_data)
-        return self.add_tags_ingredients(
-            recipe, ingredients=ingredients, tags=tags)
-
+        recipe.tags.set(tags)
+        self.set_ingredients(recipe, ingredients, created=True)
+        schedule_search_update([recipe.id])
+        change_recipes_count(recipe.author_id, 1)
+        schedule_variants(recipe.image.name)
+        return recipe
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.ingredients.clear()
-        instance.tags.clear()
         ingredients = validated_data.pop('ingredients')
+        self.store_image(validated_data)
         tags = self.initial_data.get('tags')
-        instance = self.add_tags_ingredients(
-            instance, ingredients=ingredients, tags=tags)
-        return super().update(instance, validated_data)
+        if tags is not None:
+            instance.tags.set(tags)
+        self.set_ingredients(instance, ingredients)
+        schedule_search_update([instance.id])
+        validated_data['ingredients_count'] = len(ingredients)
+        if validated_data.get('image', instance.image.name) != (
+                instance.image.name):
+            schedule_variants(validated_data['image'])
+            validated_data['image_variants'] = {}
+        # Счётчики избранного и корзины меняются отдельными UPDATE,
+        # поэтому сохраняются только поля из запроса.
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_LIMIT,
+    )
+
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
+
+
+class PantrySerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=PANTRY_LIMIT,
+    )
+    max_missing = serializers.IntegerField(min_value=0, required=False)
+
+    def validate_ingredients(self, value):
+        return list(dict.fromkeys(value))
 
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
         read_only_fields = ('id', 'name', 'image', 'cooking_time')
 
 
@@ -183,7 +310,7 @@ class FollowSerializer(serializers.ModelSerializer):
     last_name = serializers.ReadOnlyField(source='author.last_name')
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Follow
@@ -191,17 +318,8 @@ class FollowSerializer(serializers.ModelSerializer):
                   'is_subscribed', 'recipes', 'recipes_count')
 
     def get_is_subscribed(self, obj):
-        return Follow.objects.filter(
-            user=obj.user, author=obj.author
-        ).exists()
+        return True
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        queryset = Recipe.objects.filter(author=obj.author)
-        if limit:
-            queryset = queryset[:int(limit)]
-        return ShortRecipeSerializer(queryset, many=True).data
-
-    def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj.author).count()
+        recipes = self.context.get('recipes', {}).get(obj.author_id, [])
+        return ShortRecipeSerializer(recipes, many=True).data
@@ -0,0 +1,28 @@
+from dataclasses import dataclass
+from typing import Iterator
+
+from django.db.models import Sum
+
+from recipes.models import IngredientAmount
+
+CHUNK_SIZE = 2000
+
+
+@dataclass(frozen=True)
+class ShoppingListItem:
+    name: str
+    measurement_unit: str
+    amount: int
+
+
+def get_shopping_list(user) -> Iterator[ShoppingListItem]:
+    queryset = (
+        IngredientAmount.objects
+        .filter(recipe__cart__user=user)
+        .values_list('ingredients__name', 'ingredients__measurement_unit')
+        .annotate(total=Sum('amount'))
+        .order_by('ingredients__name', 'ingredients__measurement_unit')
+    )
+    for name, measurement_unit, amount in queryset.iterator(
+            chunk_size=CHUNK_SIZE):
+        yield ShoppingListItem(name, measurement_unit, amount)
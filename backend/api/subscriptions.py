@@ -0,0 +1,34 @@
+from collections import defaultdict
+
+from django.db.models import F, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, RowNumber
+
+from recipes.models import Recipe
+from users.models import Follow
+
+
+def get_subscriptions(user):
+    return Follow.objects.filter(user=user).select_related('author').annotate(
+        recipes_count=Coalesce(F('author__stats__recipes_count'), 0)
+    ).order_by('-id')
+
+
+def get_recipe_previews(author_ids, limit=None):
+    queryset = Recipe.objects.filter(author_id__in=author_ids)
+    if limit is not None:
+        ranked = queryset.order_by().annotate(recipe_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=F('pub_date').desc(),
+        )).values('id', 'recipe_number')
+        sql, params = ranked.query.sql_with_params()
+        queryset = Recipe.objects.filter(id__in=RawSQL(
+            f'SELECT ranked.id FROM ({sql}) ranked '
+            f'WHERE ranked.recipe_number <= %s',
+            (*params, limit)
+        ))
+    previews = defaultdict(list)
+    for recipe in queryset.order_by('-pub_date'):
+        previews[recipe.author_id].append(recipe)
+    return previews
@@ -1,8 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from api.views import (FollowViewSet, IngredientsViewSet, RecipeViewSet,
-                       TagsViewSet)
+from api.views import (FollowViewSet, IngredientsViewSet, MetricsView,
+                       RecipeViewSet, TagsViewSet)
 
 app_name = 'api'
 
@@ -13,6 +13,7 @@ router.register('recipes', RecipeViewSet)
 router.register('users', FollowViewSet)
 
 urlpatterns = [
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
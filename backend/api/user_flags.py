@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import CharField, Value
+
+from recipes.models import Cart, Favorite
+from users.models import Follow
+
+USER_FLAGS_TIMEOUT = 60 * 60
+EMPTY_FLAGS = {
+    'is_favorited': frozenset(),
+    'is_in_shopping_cart': frozenset(),
+    'is_subscribed': frozenset(),
+}
+
+
+def flags_version_key(user_id):
+    return f'user_flags:{user_id}:version'
+
+
+def load_user_flags(user):
+    sources = (
+        (Favorite, 'recipe_id', 'is_favorited'),
+        (Cart, 'recipe_id', 'is_in_shopping_cart'),
+        (Follow, 'author_id', 'is_subscribed'),
+    )
+    queryset, *others = (
+        model.objects.filter(user=user).annotate(
+            flag=Value(flag, output_field=CharField())
+        ).values_list('flag', field).order_by()
+        for model, field, flag in sources
+    )
+    ids = {flag: set() for flag in EMPTY_FLAGS}
+    for flag, pk in queryset.union(*others, all=True):
+        ids[flag].add(pk)
+    return {flag: frozenset(values) for flag, values in ids.items()}
+
+
+def get_user_flags(user):
+    if user.is_anonymous:
+        return EMPTY_FLAGS
+    version = cache.get_or_set(flags_version_key(user.id), 1, timeout=None)
+    key = f'user_flags:{user.id}:{version}'
+    flags = cache.get(key)
+    if flags is None:
+        flags = load_user_flags(user)
+        cache.set(key, flags, timeout=USER_FLAGS_TIMEOUT)
+    return flags
+
+
+def bump_user_flags(user_id):
+    try:
+        cache.incr(flags_version_key(user_id))
+    except ValueError:
+        cache.set(flags_version_key(user_id), 1, timeout=None)
+
+
+def invalidate_user_flags(user):
+    # Версия меняется после фиксации транзакции, иначе параллельный
+    # запрос успеет закешировать старые множества под новой версией.
+    transaction.on_commit(lambda: bump_user_flags(user.id))
+
+
+def apply_user_flags(recipe, flags):
+    author = recipe['author']
+    if author is not None:
+        author = {**author, 'is_subscribed': author['id'] in flags[
+            'is_subscribed']}
+    return {
+        **recipe,
+        'author': author,
+        'is_favorited': recipe['id'] in flags['is_favorited'],
+        'is_in_shopping_cart': recipe['id'] in flags['is_in_shopping_cart'],
+    }
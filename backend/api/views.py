@@ -1,40 +1,74 @@
 from django.contrib.auth import get_user_model
-from django.db.models import BooleanField, Exists, OuterRef, Value
-from django.http import HttpResponse
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
+from recipes.counters import (RECIPE_COUNTERS, change_followers_counts,
+                              change_recipe_counter, change_recipe_counters,
+                              change_recipes_count)
+from recipes.feed import backfill_feed, read_feed, remove_from_feed
+from recipes.db import (delete_returning, insert_or_ignore,
+                        insert_or_ignore_many)
 from recipes.models import Cart, Favorite, Ingredient, Recipe, Tag
+from recipes.pantry import match_recipes
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from api.filters import IngredientSearchFilter, TagFavoritShopingFilter
-from api.pagination import LimitPageNumberPagination
-from api.permissions import AdminOrReadOnly, AdminUserOrReadOnly
-from api.serializers import (FollowSerializer, IngredientSerializer,
+from api.cache import (RECIPE_DETAIL_TIMEOUT, RECIPE_PAGE_TIMEOUT,
+                       CatalogCacheMixin, get_catalog_version,
+                       get_recipe_version, make_detail_key, make_page_key)
+from api.filters import USER_RECIPES, TagFavoritShopingFilter
+from api.ingredient_index import ingredient_index
+from api.metrics import QueryMetricsMixin, registry
+from api.pagination import (FeedPagination, LimitPageNumberPagination,
+                            PantryPagination, RecipePagination)
+from api.permissions import (AdminOrReadOnly, AdminUserOrReadOnly,
+                             MetricsPermission)
+from api.renderers import SHOPPING_LIST_RENDERERS, ShoppingListNegotiation
+from api.serializers import (BulkIdsSerializer, FollowSerializer,
+                             IngredientSerializer, PantrySerializer,
                              RecipeReadSerializer, RecipeWriteSerializer,
-                             ShortRecipeSerializer, TagSerializer)
+                             ShortRecipeSerializer, TagSerializer,
+                             prefetch_ingredients)
+from api.shopping_list import get_shopping_list
+from api.subscriptions import get_recipe_previews, get_subscriptions
+from api.user_flags import (EMPTY_FLAGS, apply_user_flags, get_user_flags,
+                            invalidate_user_flags)
 from users.models import Follow
 
 User = get_user_model()
 
 
-class TagsViewSet(viewsets.ReadOnlyModelViewSet):
+class TagsViewSet(QueryMetricsMixin, CatalogCacheMixin,
+                  viewsets.ReadOnlyModelViewSet):
     permission_classes = (AdminOrReadOnly,)
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientsViewSet(QueryMetricsMixin, CatalogCacheMixin,
+                         viewsets.ReadOnlyModelViewSet):
     permission_classes = (AdminOrReadOnly,)
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (IngredientSearchFilter,)
-    search_fields = ('^name',)
 
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('name'):
+            return self.cached_response(
+                self.search_by_name, request, *args, **kwargs)
+        return super().list(request, *args, **kwargs)
 
-class FollowViewSet(UserViewSet):
+    def search_by_name(self, request, *args, **kwargs):
+        return Response(
+            ingredient_index.search(request.query_params['name']))
+
+
+class FollowViewSet(QueryMetricsMixin, UserViewSet):
     pagination_class = LimitPageNumberPagination
 
     @action(
@@ -47,49 +81,121 @@ class FollowViewSet(UserViewSet):
             return Response({
                 'errors': 'Ошибка подписки, нельзя подписываться на себя'
             }, status=status.HTTP_400_BAD_REQUEST)
-        if Follow.objects.filter(user=user, author=author).exists():
+        with transaction.atomic():
+            created = insert_or_ignore(Follow(user=user, author=author))
+            if created:
+                change_followers_counts([author.id], 1)
+                backfill_feed(user.id, [author.id])
+        if not created:
             return Response({
                 'errors': 'Ошибка подписки, вы уже подписаны на пользователя'
             }, status=status.HTTP_400_BAD_REQUEST)
+        invalidate_user_flags(user)
 
-        follow = Follow.objects.create(user=user, author=author)
+        follow = get_subscriptions(user).get(author=author)
         serializer = FollowSerializer(
-            follow, context={'request': request}
+            follow, context=self.get_subscriptions_context([follow])
         )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @subscribe.mapping.delete
     def del_subscribe(self, request, id=None):
         user = request.user
-        author = get_object_or_404(User, id=id)
-        if user == author:
+        if str(user.id) == str(id):
             return Response({
                 'errors': 'Ошибка отписки, нельзя отписываться от самого себя'
             }, status=status.HTTP_400_BAD_REQUEST)
-        follow = Follow.objects.filter(user=user, author=author)
-        if not follow.exists():
+        with transaction.atomic():
+            deleted, _ = Follow.objects.filter(
+                user=user, author_id=id).delete()
+            if deleted:
+                change_followers_counts([int(id)], -deleted)
+                remove_from_feed(user.id, [id])
+        if deleted:
+            invalidate_user_flags(user)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        get_object_or_404(User, id=id)
+        return Response({
+            'errors': 'Ошибка отписки, вы уже отписались'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(methods=['post'], detail=False, url_path='subscribe/bulk',
+            permission_classes=[IsAuthenticated])
+    def subscribe_bulk(self, request):
+        user = request.user
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        if user.id in ids:
+            return Response({
+                'errors': 'Ошибка подписки, нельзя подписываться на себя'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        found = set(User.objects.filter(id__in=ids).values_list(
+            'id', flat=True))
+        missing = [pk for pk in ids if pk not in found]
+        if missing:
+            return Response({
+                'errors': 'Ошибка подписки, пользователи не найдены',
+                'ids': missing,
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            added = insert_or_ignore_many(
+                (Follow(user=user, author_id=pk) for pk in ids), 'author')
+            change_followers_counts(added, 1)
+            backfill_feed(user.id, added)
+        invalidate_user_flags(user)
+        follows = list(get_subscriptions(user).filter(author_id__in=ids))
+        serializer = FollowSerializer(
+            follows,
+            many=True,
+            context=self.get_subscriptions_context(follows)
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @subscribe_bulk.mapping.delete
+    def del_subscribe_bulk(self, request):
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            removed = delete_returning(Follow.objects.filter(
+                user=request.user,
+                author_id__in=serializer.validated_data['ids']
+            ), 'author')
+            if removed:
+                change_followers_counts(removed, -1)
+                remove_from_feed(request.user.id, removed)
+        if not removed:
             return Response({
                 'errors': 'Ошибка отписки, вы уже отписались'
             }, status=status.HTTP_400_BAD_REQUEST)
-        follow.delete()
+        invalidate_user_flags(request.user)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
-        user = request.user
-        queryset = Follow.objects.filter(user=user)
+        queryset = get_subscriptions(request.user)
         pages = self.paginate_queryset(queryset)
         serializer = FollowSerializer(
             pages,
             many=True,
-            context={'request': request}
+            context=self.get_subscriptions_context(pages)
         )
         return self.get_paginated_response(serializer.data)
 
+    def get_subscriptions_context(self, follows):
+        limit = self.request.query_params.get('recipes_limit')
+        limit = int(limit) if limit and limit.isdigit() else None
+        author_ids = [follow.author_id for follow in follows]
+        return {
+            'request': self.request,
+            'recipes': get_recipe_previews(author_ids, limit),
+        }
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(QueryMetricsMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
-    pagination_class = LimitPageNumberPagination
+    pagination_class = RecipePagination
     filter_class = TagFavoritShopingFilter
     permission_classes = [AdminUserOrReadOnly]
 
@@ -98,28 +204,123 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    def handle_exception(self, exc):
+        response = super().handle_exception(exc)
+        if self.action == 'download_shopping_cart':
+            # Ошибки отдаются в JSON, а не рендерерами файла.
+            self.request.accepted_renderer = JSONRenderer()
+            self.request.accepted_media_type = JSONRenderer.media_type
+        return response
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        _, deleted = instance.delete()
+        if deleted.get(Recipe._meta.label):
+            change_recipes_count(instance.author_id, -1)
+
     def get_queryset(self):
-        user = self.request.user
-        queryset = Recipe.objects.all()
-
-        if user.is_authenticated:
-            queryset = queryset.annotate(
-                is_favorited=Exists(Favorite.objects.filter(
-                    user=user, recipe__pk=OuterRef('pk'))
-                ),
-                is_in_shopping_cart=Exists(Cart.objects.filter(
-                    user=user, recipe__pk=OuterRef('pk'))
-                )
-            )
-        else:
-            queryset = queryset.annotate(
-                is_favorited=Value(False, output_field=BooleanField()),
-                is_in_shopping_cart=Value(False, output_field=BooleanField())
+        return Recipe.objects.select_related('author').prefetch_related(
+            'tags', prefetch_ingredients())
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request.method in SAFE_METHODS:
+            flags = get_user_flags(self.request.user)
+            context.update(user_flags=flags,
+                           subscriptions=flags['is_subscribed'])
+        return context
+
+    def list(self, request, *args, **kwargs):
+        # Страницы с фильтрами по избранному и корзине зависят от
+        # пользователя, остальные общие, флаги накладываются поверх.
+        if USER_RECIPES.keys() & request.query_params.keys():
+            return super().list(request, *args, **kwargs)
+        version, _ = get_catalog_version(Recipe)
+        key = make_page_key('recipes:page', version, request)
+        data = cache.get(key)
+        if data is None:
+            data = self.get_shared_page(request)
+            cache.set(key, data, timeout=RECIPE_PAGE_TIMEOUT)
+        flags = get_user_flags(request.user)
+        return Response({**data, 'results': [
+            apply_user_flags(recipe, flags) for recipe in data['results']
+        ]})
+
+    def retrieve(self, request, *args, **kwargs):
+        recipe_id = self.kwargs[self.lookup_field]
+        if not recipe_id.isdecimal():
+            raise Http404
+        recipe_id = int(recipe_id)
+        version = get_recipe_version(
+            recipe_id, Recipe.objects.filter(pk=recipe_id).exists)
+        if version is None:
+            raise Http404
+        key = make_detail_key(recipe_id, version, request)
+        data = cache.get(key)
+        if data is None:
+            serializer = RecipeReadSerializer(
+                self.get_object(), context=self.get_shared_context())
+            data = serializer.data
+            cache.set(key, data, timeout=RECIPE_DETAIL_TIMEOUT)
+        return Response(
+            apply_user_flags(data, get_user_flags(request.user)))
+
+    def get_shared_context(self):
+        return {
+            'request': self.request,
+            'user_flags': EMPTY_FLAGS,
+            'subscriptions': EMPTY_FLAGS['is_subscribed'],
+        }
+
+    def get_shared_page(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = RecipeReadSerializer(
+            page, many=True, context=self.get_shared_context())
+        return self.get_paginated_response(serializer.data).data
+
+    @action(detail=False, permission_classes=[IsAuthenticated],
+            pagination_class=FeedPagination)
+    def feed(self, request):
+        rows = self.paginator.paginate_feed(
+            request,
+            lambda before, limit: read_feed(request.user, before, limit))
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for _, recipe_id in rows])
+        serializer = RecipeReadSerializer(
+            [recipes[recipe_id] for _, recipe_id in rows
+             if recipe_id in recipes],
+            many=True,
+            context=self.get_serializer_context()
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, url_path='what_to_cook',
+            pagination_class=PantryPagination)
+    def what_to_cook(self, request):
+        serializer = PantrySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        matches = self.paginate_queryset(
+            match_recipes(**serializer.validated_data))
+        recipes = self.get_queryset().in_bulk(
+            [match['recipe_id'] for match in matches])
+        matches = [
+            match for match in matches if match['recipe_id'] in recipes]
+        data = RecipeReadSerializer(
+            [recipes[match['recipe_id']] for match in matches],
+            many=True,
+            context=self.get_serializer_context()
+        ).data
+        for recipe, match in zip(data, matches):
+            recipe.update(
+                matched=match['matched'],
+                missing=match['missing'],
+                coverage=round(match['coverage'], 3),
             )
-        return queryset
+        return self.get_paginated_response(data)
 
     @action(detail=True, methods=['post'],
             permission_classes=[IsAuthenticated])
@@ -139,51 +340,109 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def del_from_shopping_cart(self, request, pk=None):
         return self.delete_obj(Cart, request.user, pk)
 
+    @action(detail=False, methods=['post'], url_path='favorite/bulk',
+            permission_classes=[IsAuthenticated])
+    def favorite_bulk(self, request):
+        return self.add_objs(Favorite, request)
+
+    @favorite_bulk.mapping.delete
+    def del_from_favorite_bulk(self, request):
+        return self.delete_objs(Favorite, request)
+
+    @action(detail=False, methods=['post'], url_path='shopping_cart/bulk',
+            permission_classes=[IsAuthenticated])
+    def shopping_cart_bulk(self, request):
+        return self.add_objs(Cart, request)
+
+    @shopping_cart_bulk.mapping.delete
+    def del_from_shopping_cart_bulk(self, request):
+        return self.delete_objs(Cart, request)
+
     def add_obj(self, model, user, pk):
-        if model.objects.filter(user=user, recipe__id=pk).exists():
+        recipe = get_object_or_404(Recipe, id=pk)
+        with transaction.atomic():
+            created = insert_or_ignore(model(user=user, recipe=recipe))
+            if created:
+                change_recipe_counter(recipe.id, RECIPE_COUNTERS[model], 1)
+                invalidate_user_flags(user)
+        if not created:
             return Response({
                 'errors': 'Ошибка добавления рецепта в список'
             }, status=status.HTTP_400_BAD_REQUEST)
-        recipe = get_object_or_404(Recipe, id=pk)
-        model.objects.create(user=user, recipe=recipe)
         serializer = ShortRecipeSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete_obj(self, model, user, pk):
-        obj = model.objects.filter(user=user, recipe__id=pk)
-        if obj.exists():
-            obj.delete()
+        with transaction.atomic():
+            deleted, _ = model.objects.filter(
+                user=user, recipe__id=pk).delete()
+            if deleted:
+                change_recipe_counter(pk, RECIPE_COUNTERS[model], -deleted)
+                invalidate_user_flags(user)
+        if deleted:
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response({
             'errors': 'Ошибка удаления рецепта из списка'
         }, status=status.HTTP_400_BAD_REQUEST)
 
+    def get_bulk_ids(self, request):
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['ids']
+
+    def add_objs(self, model, request):
+        user = request.user
+        ids = self.get_bulk_ids(request)
+        recipes = Recipe.objects.in_bulk(ids)
+        missing = [pk for pk in ids if pk not in recipes]
+        if missing:
+            return Response({
+                'errors': 'Ошибка добавления, рецепты не найдены',
+                'ids': missing,
+            }, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            added = insert_or_ignore_many(
+                (model(user=user, recipe_id=pk) for pk in ids), 'recipe')
+            change_recipe_counters(added, RECIPE_COUNTERS[model], 1)
+            if added:
+                invalidate_user_flags(user)
+        serializer = ShortRecipeSerializer(
+            [recipes[pk] for pk in ids], many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def delete_objs(self, model, request):
+        user = request.user
+        ids = self.get_bulk_ids(request)
+        with transaction.atomic():
+            removed = delete_returning(
+                model.objects.filter(user=user, recipe_id__in=ids), 'recipe')
+            if removed:
+                change_recipe_counters(removed, RECIPE_COUNTERS[model], -1)
+                invalidate_user_flags(user)
+        if not removed:
+            return Response({
+                'errors': 'Ошибка удаления рецептов из списка'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     @action(
-        detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+        detail=False, methods=['get'], permission_classes=[IsAuthenticated],
+        renderer_classes=SHOPPING_LIST_RENDERERS,
+        content_negotiation_class=ShoppingListNegotiation)
     def download_shopping_cart(self, request):
-        user = get_object_or_404(User, username=request.user.username)
-        shopping_cart = user.cart.all()
-        shopping_dict = {}
-        for num in shopping_cart:
-            ingredients_queryset = num.recipe.ingredient.all()
-            for ingredient in ingredients_queryset:
-                name = ingredient.ingredients.name
-                amount = ingredient.amount
-                measurement_unit = ingredient.ingredients.measurement_unit
-                if name not in shopping_dict:
-                    shopping_dict[name] = {
-                        'measurement_unit': measurement_unit,
-                        'amount': amount}
-                else:
-                    shopping_dict[name]['amount'] = (
-                        shopping_dict[name]['amount'] + amount)
-
-        shopping_list = []
-        for index, key in enumerate(shopping_dict, start=1):
-            shopping_list.append(
-                f'{index}. {key} - {shopping_dict[key]["amount"]} '
-                f'{shopping_dict[key]["measurement_unit"]}\n')
-        filename = 'shopping_cart.txt'
-        response = HttpResponse(shopping_list, content_type='text/plain')
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(get_shopping_list(request.user)),
+            content_type=renderer.content_type)
+        filename = f'shopping_cart.{renderer.format}'
         response['Content-Disposition'] = f'attachment; filename={filename}'
         return response
+
+
+class MetricsView(APIView):
+    permission_classes = (MetricsPermission,)
+
+    def get(self, request):
+        return HttpResponse(
+            registry.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8')
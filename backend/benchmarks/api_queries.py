@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from rest_framework.test import APIClient
+
+from benchmarks.base import measure, test_database
+from recipes.models import Favorite, Ingredient, IngredientAmount, Recipe, Tag
+from users.models import Follow
+
+User = get_user_model()
+
+PAGE_SIZES = (1, 6, 24, 60)
+AUTHORS = 10
+INGREDIENTS_PER_RECIPE = 5
+
+
+def create_data(recipes_count):
+    authors = [
+        User.objects.create(username=f'author{i}',
+                            email=f'author{i}@example.com')
+        for i in range(max(AUTHORS, max(PAGE_SIZES)))
+    ]
+    reader = User.objects.create(username='reader',
+                                 email='reader@example.com')
+    tags = [
+        Tag.objects.create(name=f'Тег {i}', color=f'#00000{i}',
+                           slug=f'tag{i}')
+        for i in range(3)
+    ]
+    ingredients = [
+        Ingredient.objects.create(name=f'ингредиент {i}',
+                                  measurement_unit='г')
+        for i in range(INGREDIENTS_PER_RECIPE * 2)
+    ]
+    for i in range(recipes_count):
+        recipe = Recipe(author=authors[i % AUTHORS], name=f'Рецепт {i}',
+                        text='-', cooking_time=10)
+        recipe.image.save(f'bench{i}.png', ContentFile(b'-'), save=False)
+        recipe.save()
+        recipe.tags.set(tags[:i % len(tags) + 1])
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(recipe=recipe, ingredients=ingredient, amount=1)
+            for ingredient in ingredients[i % 2::2]
+        )
+        if i % 2:
+            Favorite.objects.create(user=reader, recipe=recipe)
+    Follow.objects.bulk_create(Follow(user=reader, author=author)
+                               for author in authors[::2])
+    return reader
+
+
+def scenarios(reader):
+    recipe_id = Recipe.objects.values_list('id', flat=True).first()
+    return {
+        'list_anonymous': (None, '/api/recipes/?limit={size}'),
+        'list': (reader, '/api/recipes/?limit={size}'),
+        'list_filtered': (
+            reader, '/api/recipes/?limit={size}&tags=tag0&is_favorited=1'),
+        'detail': (reader, f'/api/recipes/{recipe_id}/'),
+        'detail_anonymous': (None, f'/api/recipes/{recipe_id}/'),
+        'users': (reader, '/api/users/?limit={size}'),
+        'users_anonymous': (None, '/api/users/?limit={size}'),
+        'users_me': (reader, '/api/users/me/'),
+        'subscriptions': (
+            reader, '/api/users/subscriptions/?limit={size}'),
+        'subscriptions_limited': (
+            reader,
+            '/api/users/subscriptions/?limit={size}&recipes_limit=2'),
+    }
+
+
+def run():
+    reader = create_data(max(PAGE_SIZES) * 2)
+    results = []
+    for name, (user, url) in scenarios(reader).items():
+        client = APIClient()
+        if user:
+            client.force_authenticate(user)
+        for size in PAGE_SIZES:
+            # Число запросов сравнивается без кеша страниц и счётчиков.
+            cache.clear()
+            with measure() as result:
+                response = client.get(url.format(size=size))
+            assert response.status_code == 200, response.content
+            result.update(scenario=name, page_size=size)
+            results.append(result)
+    return results
+
+
+def main():
+    with test_database():
+        results = run()
+    growing = []
+    for result in results:
+        print('{scenario:<18} limit={page_size:<3} queries={queries} '
+              'time={seconds:.4f}s'.format(**result))
+    for name in {result['scenario'] for result in results}:
+        counts = {result['queries'] for result in results
+                  if result['scenario'] == name}
+        if len(counts) != 1:
+            growing.append(name)
+    if growing:
+        raise SystemExit(
+            'Число запросов зависит от размера страницы: '
+            + ', '.join(sorted(growing)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import (CaptureQueriesContext, override_settings,
+                               setup_test_environment,
+                               teardown_test_environment)
+
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+
+def parse_scale(value):
+    return SCALES.get(value.lower()) or int(value)
+
+
+def benchmark_parser(description, scale, repeat):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        '--scale', type=parse_scale, default=scale,
+        help='Число рецептов: 10k, 100k, 1m или целое число.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=repeat)
+    parser.add_argument(
+        '--keepdb', action='store_true',
+        help='Сохранить тестовую базу с данными для следующих прогонов.')
+    return parser
+
+
+@contextmanager
+def test_database(keepdb=False):
+    # Бенчмарки пишут много данных, поэтому работают только
+    # с отдельной тестовой базой, которая удаляется после прогона.
+    # С keepdb база сохраняется, чтобы не генерировать данные заново.
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict['TEST']
+    if keepdb and connection.vendor == 'sqlite' and not test_settings['NAME']:
+        test_settings['NAME'] = f'{old_name}.benchmark'
+    media_root = tempfile.mkdtemp()
+    connection.creation.create_test_db(verbosity=0, keepdb=keepdb)
+    try:
+        with override_settings(MEDIA_ROOT=media_root):
+            yield
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+@contextmanager
+def measure():
+    result = {}
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        yield result
+        result['seconds'] = time.perf_counter() - start
+    result['queries'] = len(queries)
+
+
+def timeit(function, repeat, setup=None):
+    # setup выполняется перед каждым запуском и не входит в замер.
+    timings, queries = [], []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with measure() as result:
+            function()
+        timings.append(result['seconds'] * 1000)
+        queries.append(result['queries'])
+    return statistics.median(timings), max(queries)
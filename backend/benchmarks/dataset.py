@@ -0,0 +1,158 @@
+import random
+import sys
+from datetime import timedelta
+from io import StringIO
+
+import factory.random
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import OutputWrapper
+from django.db import connection
+from django.utils import timezone
+
+from benchmarks.factories import (CartFactory, FavoriteFactory,
+                                  FollowFactory, IngredientAmountFactory,
+                                  IngredientFactory, RecipeFactory,
+                                  TagFactory, UserFactory)
+from benchmarks.ingredient_search import load_ingredients
+from recipes.management.streams import Progress, batched
+from recipes.feed import rebuild_feeds
+from recipes.models import Ingredient, IngredientAmount, Recipe
+from recipes.search import rebuild_search_index
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+TAGS = 8
+RECIPES_PER_AUTHOR = 20
+READERS = 100
+TAGS_PER_RECIPE = (1, 3)
+INGREDIENTS_PER_RECIPE = (3, 10)
+FAVORITES_PER_READER = 50
+CART_PER_READER = 15
+FOLLOWS_PER_READER = 20
+ACTIVITY_DAYS = 30
+FACTORIES = (UserFactory, TagFactory, IngredientFactory, RecipeFactory,
+             IngredientAmountFactory, FavoriteFactory, CartFactory,
+             FollowFactory)
+
+
+def build(factory_class, **fields):
+    # Связанные объекты задаются только идентификаторами: SubFactory
+    # не должны создавать лишних авторов и рецептов.
+    ids = {name: fields.pop(name) for name in list(fields)
+           if name.endswith('_id')}
+    instance = factory_class.build(
+        **{name[:-3]: None for name in ids}, **fields)
+    for name, value in ids.items():
+        setattr(instance, name, value)
+    return instance
+
+
+def insert(model, objects, stdout, label):
+    progress = Progress(stdout, label)
+    for batch in batched(objects, BATCH_SIZE):
+        model.objects.bulk_create(batch)
+        progress.update(len(batch), len(batch))
+
+
+class Generator:
+    def __init__(self, recipes_count, seed=0, stdout=None):
+        self.recipes_count = recipes_count
+        self.random = random.Random(seed)
+        self.stdout = stdout or OutputWrapper(sys.stdout)
+        self.now = timezone.now()
+        factory.random.reseed_random(seed)
+        for factory_class in FACTORIES:
+            factory_class.reset_sequence()
+
+    def ids(self, queryset):
+        return list(queryset.order_by('id').values_list('id', flat=True))
+
+    def last_id(self, model):
+        return model.objects.order_by('-id').values_list(
+            'id', flat=True).first() or 0
+
+    def added(self):
+        return self.now - timedelta(
+            seconds=self.random.randint(0, ACTIVITY_DAYS * 24 * 3600))
+
+    def create_users(self, count, label):
+        last_id = self.last_id(User)
+        insert(User, (UserFactory.build() for _ in range(count)),
+               self.stdout, label)
+        return self.ids(User.objects.filter(id__gt=last_id))
+
+    def create_recipes(self, author_ids, tag_ids, ingredient_ids):
+        Tags = Recipe.tags.through
+        progress = Progress(self.stdout, Recipe._meta.verbose_name_plural)
+        for batch in batched(range(self.recipes_count), BATCH_SIZE):
+            last_id = self.last_id(Recipe)
+            Recipe.objects.bulk_create(
+                build(RecipeFactory,
+                      author_id=self.random.choice(author_ids))
+                for _ in batch
+            )
+            recipe_ids = self.ids(Recipe.objects.filter(id__gt=last_id))
+            Tags.objects.bulk_create(
+                Tags(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in self.random.sample(
+                    tag_ids, self.random.randint(*TAGS_PER_RECIPE))
+            )
+            IngredientAmount.objects.bulk_create((
+                build(IngredientAmountFactory, recipe_id=recipe_id,
+                      ingredients_id=ingredient_id)
+                for recipe_id in recipe_ids
+                for ingredient_id in self.random.sample(
+                    ingredient_ids,
+                    self.random.randint(*INGREDIENTS_PER_RECIPE))
+            ), batch_size=BATCH_SIZE)
+            progress.update(len(batch), len(recipe_ids))
+
+    def create_activity(self, reader_ids, author_ids, recipe_ids):
+        for factory_class, per_reader in ((FavoriteFactory,
+                                           FAVORITES_PER_READER),
+                                          (CartFactory, CART_PER_READER)):
+            model = factory_class._meta.model
+            insert(model, (
+                build(factory_class, user_id=reader_id, recipe_id=recipe_id,
+                      added=self.added())
+                for reader_id in reader_ids
+                for recipe_id in self.random.sample(
+                    recipe_ids, min(per_reader, len(recipe_ids)))
+            ), self.stdout, model._meta.verbose_name_plural)
+        model = FollowFactory._meta.model
+        insert(model, (
+            build(FollowFactory, user_id=reader_id, author_id=author_id)
+            for reader_id in reader_ids
+            for author_id in self.random.sample(
+                author_ids, min(FOLLOWS_PER_READER, len(author_ids)))
+        ), self.stdout, model._meta.verbose_name_plural)
+
+    def run(self):
+        tag_ids = [tag.id for tag in TagFactory.create_batch(TAGS)]
+        if not Ingredient.objects.exists():
+            load_ingredients()
+        ingredient_ids = self.ids(Ingredient.objects.all())
+        author_ids = self.create_users(
+            max(self.recipes_count // RECIPES_PER_AUTHOR, 1), 'Авторы')
+        reader_ids = self.create_users(READERS, 'Читатели')
+        self.create_recipes(author_ids, tag_ids, ingredient_ids)
+        recipe_ids = self.ids(Recipe.objects.all())
+        self.create_activity(reader_ids, author_ids, recipe_ids)
+        progress = Progress(self.stdout, 'Поисковый индекс')
+        for count in rebuild_search_index():
+            progress.update(count, count)
+        call_command('recalculate_counters', stdout=StringIO())
+        call_command('update_rankings', stdout=StringIO())
+        progress = Progress(self.stdout, 'Ленты подписок')
+        for count in rebuild_feeds():
+            progress.update(count, count)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return User.objects.get(id=reader_ids[0])
+
+
+def generate(recipes_count, seed=0, stdout=None):
+    return Generator(recipes_count, seed, stdout).run()
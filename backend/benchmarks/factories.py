@@ -0,0 +1,94 @@
+from functools import lru_cache
+
+import factory
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from factory.django import DjangoModelFactory
+
+from recipes.models import (Cart, Favorite, Ingredient, IngredientAmount,
+                            Recipe, Tag)
+from users.models import Follow
+
+User = get_user_model()
+
+PASSWORD = 'password'
+
+factory.Faker._DEFAULT_LOCALE = 'ru_RU'
+
+
+@lru_cache(maxsize=None)
+def hashed_password():
+    return make_password(PASSWORD)
+
+
+class UserFactory(DjangoModelFactory):
+    class Meta:
+        model = User
+
+    username = factory.Sequence(lambda n: f'user{n}')
+    email = factory.LazyAttribute(lambda user: f'{user.username}@example.com')
+    first_name = factory.Faker('first_name')
+    last_name = factory.Faker('last_name')
+    password = factory.LazyFunction(hashed_password)
+
+
+class TagFactory(DjangoModelFactory):
+    class Meta:
+        model = Tag
+        django_get_or_create = ('slug',)
+
+    name = factory.Sequence(lambda n: f'Тег {n}')
+    color = factory.Sequence(lambda n: f'#{n:06x}')
+    slug = factory.Sequence(lambda n: f'tag{n}')
+
+
+class IngredientFactory(DjangoModelFactory):
+    class Meta:
+        model = Ingredient
+
+    name = factory.Sequence(lambda n: f'ингредиент {n}')
+    measurement_unit = factory.Iterator(('г', 'мл', 'шт.', 'ст. л.'))
+
+
+class RecipeFactory(DjangoModelFactory):
+    class Meta:
+        model = Recipe
+
+    author = factory.SubFactory(UserFactory)
+    name = factory.Faker('sentence', nb_words=3)
+    image = 'recipe_images/benchmark.png'
+    text = factory.Faker('text', max_nb_chars=300)
+    cooking_time = factory.Faker('random_int', min=1, max=240)
+
+
+class IngredientAmountFactory(DjangoModelFactory):
+    class Meta:
+        model = IngredientAmount
+
+    recipe = factory.SubFactory(RecipeFactory)
+    ingredients = factory.SubFactory(IngredientFactory)
+    amount = factory.Faker('random_int', min=1, max=500)
+
+
+class FavoriteFactory(DjangoModelFactory):
+    class Meta:
+        model = Favorite
+
+    user = factory.SubFactory(UserFactory)
+    recipe = factory.SubFactory(RecipeFactory)
+
+
+class CartFactory(DjangoModelFactory):
+    class Meta:
+        model = Cart
+
+    user = factory.SubFactory(UserFactory)
+    recipe = factory.SubFactory(RecipeFactory)
+
+
+class FollowFactory(DjangoModelFactory):
+    class Meta:
+        model = Follow
+
+    user = factory.SubFactory(UserFactory)
+    author = factory.SubFactory(UserFactory)
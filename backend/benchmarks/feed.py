@@ -0,0 +1,82 @@
+from django.db import connection
+from rest_framework.test import APIClient
+
+from benchmarks.base import benchmark_parser, test_database, timeit
+from benchmarks.load import PAGE_SIZE, prepare
+from recipes.feed import STRATEGIES, fan_out, read_feed, rebuild_feeds
+from recipes.models import FeedEntry, Recipe
+from users.models import Follow
+
+PAGES = (1, 10)
+REPEAT = 20
+
+
+def scroll(user, pages, strategy):
+    before = None
+    for _ in range(pages):
+        rows = read_feed(user, before, PAGE_SIZE, strategy)
+        if not rows:
+            return
+        before = rows[-1]
+
+
+def run(recipes_count, seed, repeat):
+    reader = prepare(recipes_count, seed)
+    if not FeedEntry.objects.exists():
+        for _ in rebuild_feeds():
+            pass
+    results = []
+    for strategy in STRATEGIES:
+        for pages in PAGES:
+            median, queries = timeit(
+                lambda: scroll(reader, pages, strategy), repeat)
+            results.append({
+                'name': f'read strategy={strategy} pages={pages}',
+                'ms': median,
+                'queries': queries,
+            })
+    client = APIClient()
+    client.force_authenticate(reader)
+    median, queries = timeit(
+        lambda: client.get(f'/api/recipes/feed/?limit={PAGE_SIZE}'), repeat)
+    results.append({'name': 'api /api/recipes/feed/', 'ms': median,
+                    'queries': queries})
+    # Стоимость публикации: по одному свежему рецепту каждого автора,
+    # на которого подписан читатель.
+    author_ids = Follow.objects.filter(user=reader).values_list(
+        'author_id', flat=True)
+    recipe_ids = [
+        Recipe.objects.filter(author_id=author_id).values_list(
+            'id', flat=True).first()
+        for author_id in author_ids
+    ]
+    followers = Follow.objects.filter(author_id__in=author_ids).count()
+    median, queries = timeit(
+        lambda: fan_out(recipe_ids), repeat,
+        setup=lambda: FeedEntry.objects.filter(
+            recipe_id__in=recipe_ids).delete())
+    results.append({
+        'name': f'write fan-out recipes={len(recipe_ids)} '
+                f'entries={followers}',
+        'ms': median,
+        'queries': queries,
+    })
+    return results
+
+
+def main():
+    parser = benchmark_parser(
+        'Бенчмарк ленты подписок: раскладка при публикации '
+        'против слияния рецептов авторов при чтении.', '100k', REPEAT)
+    options = parser.parse_args()
+    with test_database(keepdb=options.keepdb):
+        results = run(options.scale, options.seed, options.repeat)
+        vendor = connection.vendor
+    print(f'{Recipe._meta.verbose_name_plural}: {options.scale}, '
+          f'{vendor}, медиана из {options.repeat} запусков')
+    for result in results:
+        print('{name:<42} {ms:>8.2f}ms queries={queries}'.format(**result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import json
+
+from django.conf import settings
+
+from api.ingredient_index import SEARCH_LIMIT, ingredient_index
+from benchmarks.base import test_database, timeit
+from recipes.models import Ingredient
+
+QUERIES = ('а', 'мо', 'сах', 'картоф', 'сыр', 'масло', 'ябл')
+REPEAT = 200
+
+
+def load_ingredients():
+    path = f'{settings.BASE_DIR}/static/data/ingredients.json'
+    with open(path, encoding='utf-8') as file:
+        Ingredient.objects.bulk_create(
+            Ingredient(**item) for item in json.load(file))
+
+
+def sql_search(query):
+    return list(Ingredient.objects.filter(
+        name__istartswith=query).values('id', 'name', 'measurement_unit'))
+
+
+def run():
+    load_ingredients()
+    ingredient_index.search('')
+    return [
+        {
+            'query': query,
+            'index_ms': timeit(
+                lambda: ingredient_index.search(query), REPEAT)[0],
+            'sql_ms': timeit(lambda: sql_search(query), REPEAT)[0],
+            'index_found': len(ingredient_index.search(query)),
+        }
+        for query in QUERIES
+    ]
+
+
+def main():
+    with test_database():
+        results = run()
+    print(f'{Ingredient._meta.verbose_name_plural}: top-{SEARCH_LIMIT}, '
+          f'медиана из {REPEAT} запусков')
+    for result in results:
+        print('{query:<8} index={index_ms:.4f}ms sql={sql_ms:.4f}ms '
+              'found={index_found}'.format(**result))
+
+
+if __name__ == '__main__':
+    main()
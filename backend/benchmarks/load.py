@@ -0,0 +1,214 @@
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tracemalloc
+
+import django
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import OutputWrapper
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from benchmarks.base import benchmark_parser, measure, test_database
+from benchmarks.dataset import generate
+from recipes.models import Recipe, Tag
+from users.models import Follow
+
+PERCENTILES = (50, 90, 95, 99)
+PAGE_SIZE = 6
+DEEP_PAGE = 100
+CACHE_MODES = ('cold', 'warm')
+REPEAT = 30
+WARMUP = 3
+
+
+def prepare(recipes_count, seed):
+    if Recipe.objects.count() == recipes_count:
+        return Follow.objects.order_by('id').first().user
+    call_command('flush', interactive=False, verbosity=0)
+    return generate(recipes_count, seed, OutputWrapper(sys.stderr))
+
+
+def scenarios(reader):
+    recipe_id = Recipe.objects.values_list('id', flat=True).first()
+    author_id = Follow.objects.filter(user=reader).values_list(
+        'author_id', flat=True).first()
+    first, second = Tag.objects.order_by('id').values_list(
+        'slug', flat=True)[:2]
+    list_url = f'/api/recipes/?limit={PAGE_SIZE}'
+    deep_page = max(1, min(DEEP_PAGE, Recipe.objects.count() // PAGE_SIZE))
+    return {
+        'recipes_anonymous': (None, list_url),
+        'recipes': (reader, list_url),
+        'recipes_deep_page': (reader, f'{list_url}&page={deep_page}'),
+        'recipes_tags': (reader, f'{list_url}&tags={first}&tags={second}'),
+        'recipes_author': (reader, f'{list_url}&author={author_id}'),
+        'recipes_favorited': (reader, f'{list_url}&is_favorited=1'),
+        'recipes_in_cart': (reader, f'{list_url}&is_in_shopping_cart=1'),
+        'recipes_popular': (reader, f'{list_url}&ordering=popular'),
+        'recipes_trending': (reader, f'{list_url}&ordering=trending'),
+        'recipe_detail': (reader, f'/api/recipes/{recipe_id}/'),
+        'subscriptions': (
+            reader, f'/api/users/subscriptions/?limit={PAGE_SIZE}'
+                    '&recipes_limit=3'),
+        'ingredient_search': (None, '/api/ingredients/?name=мо'),
+        'shopping_list_txt': (
+            reader, '/api/recipes/download_shopping_cart/?format=txt'),
+        'shopping_list_pdf': (
+            reader, '/api/recipes/download_shopping_cart/?format=pdf'),
+    }
+
+
+def fetch(client, url):
+    response = client.get(url)
+    if response.streaming:
+        content = b''.join(response.streaming_content)
+    else:
+        content = response.content
+    assert response.status_code == 200, (url, response.status_code)
+    return len(content)
+
+
+def percentiles(values):
+    points = statistics.quantiles(values, n=100, method='inclusive')
+    return {f'p{point}': round(points[point - 1], 3)
+            for point in PERCENTILES}
+
+
+def run_scenario(user, url, repeat, cache_mode='cold'):
+    # В холодном режиме кеш очищается перед каждым запросом и
+    # измеряются запросы к базе, в тёплом — ответы из кеша.
+    client = APIClient()
+    if user:
+        client.force_authenticate(user)
+    for _ in range(WARMUP):
+        fetch(client, url)
+    timings, queries = [], []
+    for _ in range(repeat):
+        if cache_mode == 'cold':
+            cache.clear()
+        with measure() as result:
+            size = fetch(client, url)
+        timings.append(result['seconds'] * 1000)
+        queries.append(result['queries'])
+    # Трассировка памяти замедляет запрос, поэтому выполняется отдельно.
+    if cache_mode == 'cold':
+        cache.clear()
+    tracemalloc.start()
+    fetch(client, url)
+    allocated, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'url': url,
+        'latency_ms': {
+            **percentiles(timings),
+            'mean': round(statistics.mean(timings), 3),
+            'max': round(max(timings), 3),
+        },
+        'queries': max(queries),
+        'allocated_kb': round(allocated / 1024, 1),
+        'peak_kb': round(peak / 1024, 1),
+        'response_bytes': size,
+    }
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(recipes_count, seed, repeat, only, cache_mode='cold'):
+    reader = prepare(recipes_count, seed)
+    results = {}
+    for name, (user, url) in scenarios(reader).items():
+        if only and name not in only:
+            continue
+        results[name] = run_scenario(user, url, repeat, cache_mode)
+        sys.stderr.write(
+            '{name:<20} p50={p50:>8.2f}ms p95={p95:>8.2f}ms '
+            'queries={queries:<3} peak={peak:.0f}KB\n'.format(
+                name=name, p50=results[name]['latency_ms']['p50'],
+                p95=results[name]['latency_ms']['p95'],
+                queries=results[name]['queries'],
+                peak=results[name]['peak_kb']))
+    return {
+        'meta': {
+            'commit': commit(),
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'recipes': recipes_count,
+            'seed': seed,
+            'repeat': repeat,
+            'cache': cache_mode,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline):
+    # Прогоны до появления --cache измеряли ответы из кеша.
+    old_mode = baseline['meta'].get('cache', 'warm')
+    if old_mode != report['meta']['cache']:
+        raise SystemExit(
+            f'Нельзя сравнивать режимы кеша {old_mode} и '
+            f'{report["meta"]["cache"]}.')
+    regressions = []
+    for name, result in report['results'].items():
+        old = baseline['results'].get(name)
+        if old is None:
+            continue
+        p50 = result['latency_ms']['p50']
+        old_p50 = old['latency_ms']['p50']
+        change = (p50 - old_p50) / old_p50 * 100 if old_p50 else 0
+        sys.stderr.write(
+            f'{name:<20} p50 {old_p50:.2f} -> {p50:.2f}ms ({change:+.0f}%), '
+            f'queries {old["queries"]} -> {result["queries"]}\n')
+        if result['queries'] > old['queries']:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = benchmark_parser(
+        'Нагрузочный бенчмарк API на синтетических данных.', '10k', REPEAT)
+    parser.add_argument(
+        '--scenario', action='append', dest='only',
+        help='Запустить только указанные сценарии.')
+    parser.add_argument(
+        '--cache', choices=CACHE_MODES, default='cold', dest='cache_mode',
+        help='cold — очищать кеш перед каждым запросом, '
+             'warm — измерять ответы из кеша.')
+    parser.add_argument(
+        '--output', help='Файл для результатов в формате JSON.')
+    parser.add_argument(
+        '--compare', help='JSON с результатами предыдущего прогона.')
+    options = parser.parse_args()
+    with test_database(keepdb=options.keepdb):
+        report = run(options.scale, options.seed, options.repeat,
+                     options.only, options.cache_mode)
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as file:
+            file.write(output)
+    else:
+        print(output)
+    if options.compare:
+        with open(options.compare, encoding='utf-8') as file:
+            regressions = compare(report, json.load(file))
+        if regressions:
+            raise SystemExit(
+                'Выросло число запросов: ' + ', '.join(regressions))
+
+
+if __name__ == '__main__':
+    main()
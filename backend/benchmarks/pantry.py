@@ -0,0 +1,73 @@
+import random
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q
+from rest_framework.test import APIClient
+
+from benchmarks.base import benchmark_parser, test_database, timeit
+from benchmarks.load import PAGE_SIZE, prepare
+from recipes.models import Ingredient, Recipe
+from recipes.pantry import match_recipes
+
+PANTRY_SIZES = (3, 10, 25, 50)
+REPEAT = 20
+SCAN_REPEAT = 3
+
+
+def scan(ingredients):
+    # Без индекса: подсчёт совпадений для каждого рецепта каталога.
+    return list(
+        Recipe.objects.annotate(matched=Count(
+            'ingredient',
+            filter=Q(ingredient__ingredients_id__in=ingredients)))
+        .filter(matched__gt=0)
+        .order_by('-matched', '-id').values_list('id', flat=True)[:PAGE_SIZE]
+    )
+
+
+def run(recipes_count, seed, repeat):
+    reader = prepare(recipes_count, seed)
+    client = APIClient()
+    client.force_authenticate(reader)
+    ingredient_ids = list(Ingredient.objects.order_by('id').values_list(
+        'id', flat=True))
+    rng = random.Random(seed)
+    results = []
+    for size in PANTRY_SIZES:
+        ingredients = rng.sample(ingredient_ids, size)
+        result = {'size': size}
+
+        def api():
+            response = client.get('/api/recipes/what_to_cook/', {
+                'ingredients': ingredients, 'limit': PAGE_SIZE})
+            assert response.status_code == 200, response.status_code
+            result['found'] = response.data['count']
+
+        result['api_ms'], result['api_queries'] = timeit(
+            api, repeat, setup=cache.clear)
+        result['index_ms'], _ = timeit(lambda: list(
+            match_recipes(ingredients)[:PAGE_SIZE]), repeat)
+        result['scan_ms'], _ = timeit(lambda: scan(ingredients), SCAN_REPEAT)
+        results.append(result)
+    return results
+
+
+def main():
+    parser = benchmark_parser(
+        'Бенчмарк подбора рецептов по ингредиентам.', '100k', REPEAT)
+    options = parser.parse_args()
+    with test_database(keepdb=options.keepdb):
+        results = run(options.scale, options.seed, options.repeat)
+        vendor = connection.vendor
+    print(f'{Recipe._meta.verbose_name_plural}: {options.scale}, '
+          f'{vendor}, медиана из {options.repeat} запусков '
+          f'(без индекса — из {SCAN_REPEAT})')
+    for result in results:
+        print('ингредиентов={size:<3} api={api_ms:.2f}ms '
+              'queries={api_queries} index={index_ms:.2f}ms '
+              'scan={scan_ms:.2f}ms found={found}'.format(**result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from rest_framework.test import APIClient
+
+from benchmarks.base import benchmark_parser, test_database, timeit
+from benchmarks.load import PAGE_SIZE, prepare
+from recipes.models import Recipe
+from recipes.search import search_recipes, tokenize
+
+INGREDIENT_QUERIES = ('молоко', 'сахар', 'мука яйца')
+REPEAT = 20
+SCAN_REPEAT = 3
+
+
+def sample_queries():
+    names = Recipe.objects.order_by('id').values_list('name', flat=True)[:3]
+    words = [tokenize(name) for name in names]
+    return (
+        [words[0][0], ' '.join(words[1][:2]), f'{words[2][0]} молоко']
+        + list(INGREDIENT_QUERIES)
+    )
+
+
+def scan(query):
+    # Так искали до индекса: LIKE по всем рецептам и их ингредиентам.
+    condition = Q()
+    for word in query.split():
+        condition &= (Q(name__icontains=word) | Q(text__icontains=word)
+                      | Q(ingredients__name__icontains=word))
+    return list(Recipe.objects.filter(condition).distinct().order_by(
+        '-pub_date').values_list('id', flat=True)[:PAGE_SIZE])
+
+
+def run(recipes_count, seed, repeat):
+    reader = prepare(recipes_count, seed)
+    client = APIClient()
+    client.force_authenticate(reader)
+    results = []
+    for query in sample_queries():
+        result = {'query': query}
+
+        def api():
+            response = client.get(
+                '/api/recipes/', {'search': query, 'limit': PAGE_SIZE})
+            assert response.status_code == 200, response.status_code
+            result['found'] = response.data['count']
+
+        result['api_ms'], result['api_queries'] = timeit(
+            api, repeat, setup=cache.clear)
+        result['index_ms'], _ = timeit(lambda: list(search_recipes(
+            Recipe.objects.all(), query
+        ).values_list('id', flat=True)[:PAGE_SIZE]), repeat)
+        result['scan_ms'], _ = timeit(lambda: scan(query), SCAN_REPEAT)
+        results.append(result)
+    return results
+
+
+def main():
+    parser = benchmark_parser(
+        'Бенчмарк полнотекстового поиска рецептов.', '1m', REPEAT)
+    options = parser.parse_args()
+    with test_database(keepdb=options.keepdb):
+        results = run(options.scale, options.seed, options.repeat)
+        vendor = connection.vendor
+    print(f'{Recipe._meta.verbose_name_plural}: {options.scale}, '
+          f'{vendor}, медиана из {options.repeat} запусков '
+          f'(LIKE — из {SCAN_REPEAT})')
+    for result in results:
+        print('{query:<24} api={api_ms:.2f}ms queries={api_queries} '
+              'index={index_ms:.2f}ms like={scan_ms:.2f}ms '
+              'found={found}'.format(**result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+
+from api.shopping_list import get_shopping_list
+from benchmarks.base import measure, test_database
+from recipes.models import Cart, Ingredient, IngredientAmount, Recipe
+
+User = get_user_model()
+
+CART_SIZES = (1, 10, 100, 500)
+INGREDIENTS_PER_RECIPE = 10
+
+
+def fill_cart(user, author, ingredients, size):
+    Recipe.objects.bulk_create(
+        Recipe(author=author, name=f'Рецепт {i}', text='-', cooking_time=1)
+        for i in range(size)
+    )
+    recipes = Recipe.objects.filter(author=author).order_by('id')[:size]
+    IngredientAmount.objects.bulk_create(
+        IngredientAmount(recipe=recipe, ingredients=ingredient, amount=1)
+        for recipe in recipes
+        for ingredient in ingredients
+    )
+    Cart.objects.bulk_create(Cart(user=user, recipe=recipe)
+                             for recipe in recipes)
+
+
+def run():
+    results = []
+    for size in CART_SIZES:
+        author = User.objects.create(username=f'author{size}',
+                                     email=f'author{size}@example.com')
+        user = User.objects.create(username=f'user{size}',
+                                   email=f'user{size}@example.com')
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {size}-{i}', measurement_unit='г')
+            for i in range(INGREDIENTS_PER_RECIPE)
+        )
+        ingredients = Ingredient.objects.filter(
+            name__startswith=f'ингредиент {size}-')
+        fill_cart(user, author, ingredients, size)
+        with measure() as result:
+            items = list(get_shopping_list(user))
+        result.update(cart_size=size, lines=len(items))
+        results.append(result)
+    return results
+
+
+def main():
+    with test_database():
+        results = run()
+    for result in results:
+        print('cart={cart_size:<5} lines={lines:<4} queries={queries} '
+              'time={seconds:.4f}s'.format(**result))
+    if len({result['queries'] for result in results}) != 1:
+        raise SystemExit('Число запросов зависит от размера корзины')
+
+
+if __name__ == '__main__':
+    main()
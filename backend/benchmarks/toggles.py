@@ -0,0 +1,115 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from rest_framework.test import APIClient
+
+from benchmarks.base import measure, test_database
+from recipes.models import Favorite, Recipe
+from users.models import AuthorStats, Follow
+
+User = get_user_model()
+
+THREADS = 8
+# В смешанном сценарии половина потоков добавляет, половина удаляет,
+# поэтому число успешных ответов не фиксировано.
+MIXED = ('favorite_mixed', 'subscribe_mixed')
+
+
+def concurrent(user, methods, url):
+    barrier = Barrier(THREADS)
+
+    def request(number):
+        client = APIClient()
+        client.force_authenticate(user)
+        barrier.wait()
+        try:
+            method = methods[number % len(methods)]
+            return getattr(client, method)(url).status_code
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        return Counter(executor.map(request, range(THREADS)))
+
+
+def run():
+    user = User.objects.create(username='user', email='user@example.com')
+    author = User.objects.create(username='author',
+                                 email='author@example.com')
+    recipe = Recipe.objects.create(author=author, name='Рецепт', text='-',
+                                   cooking_time=1, image='bench.png')
+    favorite_url = f'/api/recipes/{recipe.id}/favorite/'
+    subscribe_url = f'/api/users/{author.id}/subscribe/'
+    # Запись другого пользователя остаётся до конца: лишнее уменьшение
+    # счётчика не спрячется за нулём.
+    other = User.objects.create(username='other', email='other@example.com')
+    client = APIClient()
+    client.force_authenticate(other)
+    client.post(favorite_url)
+    client.post(subscribe_url)
+    results = {
+        'favorite_add': concurrent(user, ('post',), favorite_url),
+        'favorite_delete': concurrent(user, ('delete',), favorite_url),
+        'favorite_mixed': concurrent(user, ('post', 'delete'), favorite_url),
+        'subscribe': concurrent(user, ('post',), subscribe_url),
+        'unsubscribe': concurrent(user, ('delete',), subscribe_url),
+        'subscribe_mixed': concurrent(
+            user, ('post', 'delete'), subscribe_url),
+    }
+    client = APIClient()
+    client.force_authenticate(user)
+    # Смешанные сценарии могли оставить запись: замеры идут с нуля.
+    client.delete(favorite_url)
+    client.delete(subscribe_url)
+    for name, (method, url) in {
+        'favorite_add_queries': ('post', favorite_url),
+        'favorite_delete_queries': ('delete', favorite_url),
+        'subscribe_queries': ('post', subscribe_url),
+        'unsubscribe_queries': ('delete', subscribe_url),
+    }.items():
+        with measure() as result:
+            getattr(client, method)(url)
+        results[name] = result['queries']
+    recipe.refresh_from_db()
+    results['favorites_count'] = recipe.favorites_count
+    results['favorites_left'] = Favorite.objects.filter(
+        recipe=recipe).count()
+    results['followers_count'] = AuthorStats.objects.get(
+        author=author).followers_count
+    results['follows_left'] = Follow.objects.filter(author=author).count()
+    return results
+
+
+def main():
+    # SQLite не допускает одновременной записи из нескольких потоков,
+    # поэтому гонки проверяются только на PostgreSQL.
+    if connection.vendor != 'postgresql':
+        raise SystemExit('Бенчмарк одновременных запросов требует '
+                         f'PostgreSQL, текущая база: {connection.vendor}.')
+    with test_database():
+        results = run()
+    for name, value in results.items():
+        if isinstance(value, Counter):
+            value = dict(value)
+        print(f'{name:<24} {value}')
+    errors = [
+        name for name, value in results.items()
+        if isinstance(value, Counter) and (
+            value.get(500) or name not in MIXED and sum(
+                count for code, count in value.items()
+                if code in (201, 204)) != 1)
+    ]
+    if results['favorites_count'] != results['favorites_left']:
+        errors.append('favorites_count')
+    if results['followers_count'] != results['follows_left']:
+        errors.append('followers_count')
+    if errors:
+        raise SystemExit('Некорректная обработка одновременных запросов: '
+                         + ', '.join(errors))
+
+
+if __name__ == '__main__':
+    main()
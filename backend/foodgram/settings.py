@@ -44,6 +44,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.metrics.QueryMetricsMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -85,6 +86,16 @@ DATABASES = {
 }
 
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -127,6 +138,12 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+IMAGE_PIPELINE_WORKERS = int(os.getenv('IMAGE_PIPELINE_WORKERS', 2))
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
+
 CORS_ORIGIN_ALLOW_ALL = True
 CORS_URLS_REGEX = r'^/api/.*$'
 
@@ -146,6 +163,21 @@ REST_FRAMEWORK = {
     ],
 }
 
+QUERY_BUDGETS = {
+    'RecipeViewSet.list': 8,
+    'RecipeViewSet.retrieve': 7,
+    'RecipeViewSet.what_to_cook': 8,
+    'RecipeViewSet.feed': 8,
+    'FollowViewSet.list': 4,
+    'FollowViewSet.me': 2,
+    'FollowViewSet.subscriptions': 4,
+    'TagsViewSet.list': 2,
+    'IngredientsViewSet.list': 2,
+}
+QUERY_BUDGET_STRICT = False
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'HIDE_USERS': False,
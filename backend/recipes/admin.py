@@ -1,6 +1,8 @@
 from django.contrib.admin import ModelAdmin, register
 
+from .counters import recount_ingredients
 from .models import Cart, Favorite, Ingredient, IngredientAmount, Recipe, Tag
+from .search import schedule_search_update
 
 
 @register(Tag)
@@ -14,6 +16,19 @@ class IngredientAdmin(ModelAdmin):
     list_filter = ('name',)
     search_fields = ('name',)
 
+    def delete_model(self, request, obj):
+        recipe_ids = list(obj.recipe.values_list('recipe_id', flat=True))
+        super().delete_model(request, obj)
+        recount_ingredients(recipe_ids)
+        schedule_search_update(recipe_ids)
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = list(IngredientAmount.objects.filter(
+            ingredients__in=queryset).values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        recount_ingredients(recipe_ids)
+        schedule_search_update(recipe_ids)
+
 
 @register(Recipe)
 class RecipeAdmin(ModelAdmin):
@@ -22,8 +37,12 @@ class RecipeAdmin(ModelAdmin):
     readonly_fields = ('count_favorites',)
     search_fields = ('name', 'author__username')
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        schedule_search_update([obj.pk])
+
     def count_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
     count_favorites.short_description = 'Число добавлений в избранное'
 
@@ -36,6 +55,25 @@ class IngredientAmountAdmin(ModelAdmin):
                     )
     search_fields = ('recipe__name',)
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # При переносе в другой рецепт меняется и прежний рецепт.
+        recipe_ids = {
+            obj.recipe_id, form.initial.get('recipe', obj.recipe_id)}
+        recount_ingredients(recipe_ids)
+        schedule_search_update(recipe_ids)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        recount_ingredients([obj.recipe_id])
+        schedule_search_update([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = list(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        recount_ingredients(recipe_ids)
+        schedule_search_update(recipe_ids)
+
     
 
 
@@ -0,0 +1,74 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Cart, Favorite, IngredientAmount, Recipe
+from users.models import AuthorStats, Follow
+
+RECIPE_COUNTERS = {
+    Favorite: 'favorites_count',
+    Cart: 'in_carts_count',
+}
+
+
+def change_counter(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def change_recipe_counter(recipe_id, field, delta):
+    return change_counter(Recipe.objects.filter(pk=recipe_id), field, delta)
+
+
+def change_recipe_counters(recipe_ids, field, delta):
+    if not recipe_ids:
+        return 0
+    return change_counter(
+        Recipe.objects.filter(pk__in=recipe_ids), field, delta)
+
+
+def recount_ingredients(recipe_ids):
+    # Ингредиенты, изменённые в обход API, пересчитываются одним UPDATE.
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return 0
+    return Recipe.objects.filter(pk__in=recipe_ids).update(
+        ingredients_count=Coalesce(Subquery(
+            IngredientAmount.objects.filter(recipe=OuterRef('pk'))
+            .order_by().values('recipe').annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField(),
+        ), 0))
+
+
+def create_author_stats(author_id):
+    AuthorStats.objects.get_or_create(
+        author_id=author_id,
+        defaults={
+            'recipes_count': Recipe.objects.filter(
+                author_id=author_id).count(),
+            'followers_count': Follow.objects.filter(
+                author_id=author_id).count(),
+        },
+    )
+
+
+def change_recipes_count(author_id, delta):
+    if author_id is None:
+        return
+    stats = AuthorStats.objects.filter(author_id=author_id)
+    if change_counter(stats, 'recipes_count', delta):
+        return
+    create_author_stats(author_id)
+
+
+def change_followers_counts(author_ids, delta):
+    if not author_ids:
+        return
+    stats = AuthorStats.objects.filter(author_id__in=author_ids)
+    if change_counter(stats, 'followers_count', delta) == len(author_ids):
+        return
+    existing = set(stats.values_list('author_id', flat=True))
+    for author_id in author_ids:
+        if author_id not in existing:
+            create_author_stats(author_id)
@@ -0,0 +1,82 @@
+from django.db import connections, router
+from django.db.models.sql import DeleteQuery, InsertQuery
+
+
+def insert_statements(instances, using):
+    model = type(instances[0])
+    opts = model._meta
+    fields = [
+        field for field in opts.local_concrete_fields
+        if field is not opts.auto_field
+    ]
+    query = InsertQuery(model, ignore_conflicts=True)
+    query.insert_values(fields, instances)
+    return query.get_compiler(using).as_sql()
+
+
+def can_return_rows(connection):
+    # Django 3.2 не включает RETURNING для SQLite, хотя он есть с 3.35.
+    if connection.features.can_return_rows_from_bulk_insert:
+        return True
+    return (connection.vendor == 'sqlite'
+            and connection.Database.sqlite_version_info >= (3, 35))
+
+
+def insert_or_ignore(instance):
+    using = router.db_for_write(type(instance))
+    inserted = 0
+    with connections[using].cursor() as cursor:
+        for sql, params in insert_statements([instance], using):
+            cursor.execute(sql, params)
+            inserted += cursor.rowcount
+    return inserted > 0
+
+
+def insert_or_ignore_many(instances, field):
+    # Возвращает значения field только у строк, которые действительно
+    # вставлены: строки, добавленные параллельным запросом, пропускаются.
+    instances = list(instances)
+    if not instances:
+        return []
+    model = type(instances[0])
+    attname = model._meta.get_field(field).attname
+    column = model._meta.get_field(field).column
+    using = router.db_for_write(model)
+    connection = connections[using]
+    inserted = []
+    with connection.cursor() as cursor:
+        if can_return_rows(connection):
+            returning = f' RETURNING {connection.ops.quote_name(column)}'
+            for sql, params in insert_statements(instances, using):
+                cursor.execute(sql + returning, params)
+                inserted += [value for value, in cursor.fetchall()]
+            return inserted
+        for instance in instances:
+            for sql, params in insert_statements([instance], using):
+                cursor.execute(sql, params)
+                if cursor.rowcount > 0:
+                    inserted.append(getattr(instance, attname))
+    return inserted
+
+
+def delete_returning(queryset, field):
+    # Возвращает значения field только у строк, которые удалил этот
+    # запрос, а не параллельный.
+    model = queryset.model
+    attname = model._meta.get_field(field).attname
+    column = model._meta.get_field(field).column
+    using = router.db_for_write(model)
+    connection = connections[using]
+    if not can_return_rows(connection):
+        deleted = []
+        for pk, value in queryset.values_list('pk', attname):
+            if model.objects.filter(pk=pk)._raw_delete(using):
+                deleted.append(value)
+        return deleted
+    query = queryset.query.clone()
+    query.__class__ = DeleteQuery
+    sql, params = query.get_compiler(using).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{sql} RETURNING {connection.ops.quote_name(column)}', params)
+        return [value for value, in cursor.fetchall()]
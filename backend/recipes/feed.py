@@ -0,0 +1,172 @@
+import heapq
+
+from django.db import connections, router, transaction
+from django.db.models import F, Q, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, RowNumber
+
+from recipes.models import FeedEntry, Recipe
+from users.models import Follow
+
+# Рецепты авторов с большим числом подписчиков не раскладываются по
+# лентам при публикации, а подмешиваются при чтении.
+FANOUT_LIMIT = 1000
+FEED_LENGTH = 500
+BATCH_SIZE = 1000
+STRATEGIES = ('write', 'read')
+
+
+def before_cursor(queryset, before, id_field):
+    if before is None:
+        return queryset
+    pub_date, pk = before
+    return queryset.filter(
+        Q(pub_date__lt=pub_date)
+        | Q(pub_date=pub_date, **{f'{id_field}__lt': pk}))
+
+
+def pushed_authors():
+    # Авторы без статистики ещё не набрали подписчиков и считаются
+    # небольшими, как и в split_authors.
+    return (Q(author__stats=None)
+            | Q(author__stats__followers_count__lte=FANOUT_LIMIT))
+
+
+def trim_feeds(user_ids):
+    # Раскладка только добавляет записи, поэтому записи старше
+    # FEED_LENGTH последних удаляются одним запросом на пачку подписчиков.
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        ranked = (
+            FeedEntry.objects.filter(
+                user_id__in=user_ids[start:start + BATCH_SIZE])
+            .order_by().annotate(entry_number=Window(
+                expression=RowNumber(),
+                partition_by=[F('user_id')],
+                order_by=[F('pub_date').desc(), F('recipe_id').desc()],
+            )).values('id', 'entry_number'))
+        sql, params = ranked.query.sql_with_params()
+        FeedEntry.objects.filter(id__in=RawSQL(
+            f'SELECT ranked.id FROM ({sql}) ranked '
+            f'WHERE ranked.entry_number > %s',
+            (*params, FEED_LENGTH)
+        )).delete()
+
+
+def fan_out(recipe_ids):
+    recipes = list(
+        Recipe.objects.filter(pushed_authors(), id__in=recipe_ids)
+        .values_list('id', 'author_id', 'pub_date'))
+    followers = {}
+    for author_id, user_id in Follow.objects.filter(
+            author_id__in={author_id for _, author_id, _ in recipes}
+    ).values_list('author_id', 'user_id'):
+        followers.setdefault(author_id, []).append(user_id)
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                      author_id=author_id, pub_date=pub_date)
+            for recipe_id, author_id, pub_date in recipes
+            for user_id in followers.get(author_id, ())
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim_feeds({
+        user_id for user_ids in followers.values() for user_id in user_ids})
+
+
+def schedule_fan_out(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        transaction.on_commit(lambda: fan_out(recipe_ids))
+
+
+def backfill_feed(user_id, author_ids):
+    # При подписке в ленту попадают последние рецепты автора.
+    recipes = (
+        Recipe.objects.filter(pushed_authors(), author_id__in=author_ids)
+        .order_by('-pub_date', '-id')
+        .values_list('id', 'author_id', 'pub_date')[:FEED_LENGTH])
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                      author_id=author_id, pub_date=pub_date)
+            for recipe_id, author_id, pub_date in recipes
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim_feeds([user_id])
+
+
+def remove_from_feed(user_id, author_ids):
+    FeedEntry.objects.filter(
+        user_id=user_id, author_id__in=author_ids).delete()
+
+
+def rebuild_feeds(batch_size=BATCH_SIZE):
+    last_id = 0
+    while True:
+        user_ids = list(
+            Follow.objects.filter(user_id__gt=last_id).order_by('user_id')
+            .values_list('user_id', flat=True).distinct()[:batch_size])
+        if not user_ids:
+            return
+        authors = {}
+        for user_id, author_id in Follow.objects.filter(
+                user_id__in=user_ids).values_list('user_id', 'author_id'):
+            authors.setdefault(user_id, []).append(author_id)
+        with transaction.atomic():
+            FeedEntry.objects.filter(user_id__in=user_ids).delete()
+            for user_id in user_ids:
+                backfill_feed(user_id, authors[user_id])
+        last_id = user_ids[-1]
+        yield len(user_ids)
+
+
+def split_authors(user, strategy=None):
+    push, pull = [], []
+    for author_id, followers in Follow.objects.filter(user=user).values_list(
+            'author_id', Coalesce('author__stats__followers_count', 0)):
+        if strategy == 'read' or (
+                strategy is None and followers > FANOUT_LIMIT):
+            pull.append(author_id)
+        else:
+            push.append(author_id)
+    return push, pull
+
+
+def read_entries(user, author_ids, before, limit):
+    return list(
+        before_cursor(
+            FeedEntry.objects.filter(user=user, author_id__in=author_ids),
+            before, 'recipe_id')
+        .order_by('-pub_date', '-recipe_id')
+        .values_list('pub_date', 'recipe_id')[:limit])
+
+
+def read_authors(author_ids, before, limit):
+    # У каждого автора берутся первые limit рецептов по индексу
+    # (author, -pub_date); где можно, одним запросом UNION ALL.
+    streams = [
+        before_cursor(Recipe.objects.filter(author_id=author_id),
+                      before, 'id')
+        .order_by('-pub_date', '-id')
+        .values_list('pub_date', 'id')[:limit]
+        for author_id in author_ids
+    ]
+    features = connections[router.db_for_read(Recipe)].features
+    if len(streams) > 1 and features.supports_slicing_ordering_in_compound:
+        return list(streams[0].union(*streams[1:], all=True))
+    return [row for stream in streams for row in stream]
+
+
+def read_feed(user, before=None, limit=FEED_LENGTH, strategy=None):
+    push, pull = split_authors(user, strategy)
+    rows = []
+    if push:
+        rows += read_entries(user, push, before, limit)
+    if pull:
+        rows += read_authors(pull, before, limit)
+    return heapq.nlargest(limit, rows)
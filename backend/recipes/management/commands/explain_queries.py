@@ -0,0 +1,88 @@
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Exists, F, OuterRef
+
+from recipes.models import Favorite, Ingredient, Recipe, SearchTerm, Tag
+from recipes.search import search_recipes
+
+INDEX_PATTERNS = (
+    re.compile(r'Index (?:Only )?Scan(?: Backward)? using (\w+)'),
+    re.compile(r'Bitmap Index Scan on (\w+)'),
+    re.compile(r'USING (?:COVERING )?INDEX (\w+)'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Выполняет EXPLAIN для основных запросов и проверяет индексы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--no-seqscan', action='store_true',
+            help='Запретить планировщику PostgreSQL последовательное '
+                 'сканирование, чтобы проверить применимость индексов.')
+
+    def get_queries(self):
+        author_id = Recipe.objects.values_list(
+            'author_id', flat=True).first() or 1
+        tag_id = Tag.objects.values_list('id', flat=True).first() or 1
+        user_id = Favorite.objects.values_list(
+            'user_id', flat=True).first() or 1
+        term = SearchTerm.objects.values_list(
+            'term', flat=True).first() or 'суп'
+        queries = [
+            ('Лента рецептов', ('recipe_pub_date_idx',),
+             Recipe.objects.order_by('-pub_date')[:6]),
+            ('Рецепты автора', ('recipe_author_pub_date_idx',),
+             Recipe.objects.filter(author_id=author_id)
+             .order_by('-pub_date')[:6]),
+            ('Рецепты по тегу', (),
+             Recipe.objects.filter(Exists(Recipe.tags.through.objects.filter(
+                 recipe_id=OuterRef('pk'), tag_id=tag_id)))
+             .order_by('-pub_date')[:6]),
+            ('Избранное пользователя', (),
+             Recipe.objects.filter(id__in=Favorite.objects.filter(
+                 user_id=user_id).values('recipe_id'))
+             .order_by('-pub_date')[:6]),
+            ('Поиск рецептов', (),
+             search_recipes(Recipe.objects.all(), term)[:6]),
+            ('Популярные рецепты', ('recipe_popular_idx',),
+             Recipe.objects.order_by('-favorites_count', '-pub_date')[:6]),
+            ('Рецепты в тренде', ('ranking_score_idx',),
+             Recipe.objects.order_by(
+                 F('ranking__score').desc(nulls_last=True))[:6]),
+            ('Поиск ингредиента по началу названия',
+             ('ingredient_name_upper_idx', 'ingredient_name_pattern_idx'),
+             Ingredient.objects.filter(name__istartswith='сах')),
+        ]
+        if connection.vendor == 'postgresql':
+            queries.append(
+                ('Поиск ингредиента по подстроке',
+                 ('ingredient_name_trgm_idx',),
+                 Ingredient.objects.filter(name__icontains='сах')))
+        return queries
+
+    def handle(self, *args, **options):
+        if options['no_seqscan'] and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+        missing = 0
+        for title, expected, queryset in self.get_queries():
+            plan = queryset.explain()
+            used = {
+                name
+                for pattern in INDEX_PATTERNS
+                for name in pattern.findall(plan)
+            }
+            ok = bool(used & set(expected)) if expected else bool(used)
+            missing += not ok
+            style = self.style.SUCCESS if ok else self.style.WARNING
+            self.stdout.write(style(
+                f'{title}: {"индекс используется" if ok else "нет индекса"} '
+                f'({", ".join(sorted(used)) or "-"})'))
+            if options['verbosity'] > 1:
+                self.stdout.write(plan)
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f'Запросов без ожидаемого индекса: {missing}'))
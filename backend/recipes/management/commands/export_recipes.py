@@ -0,0 +1,86 @@
+import csv
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+
+from recipes.management.streams import FORMATS, detect_format
+from recipes.models import IngredientAmount, Recipe, Tag
+
+FIELDNAMES = ('author', 'name', 'text', 'cooking_time', 'image', 'tags',
+              'ingredients')
+
+
+class Command(BaseCommand):
+    help = 'Выгружает рецепты в файл JSON, NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу или "-" для stdout.')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def iter_recipes(self, batch_size):
+        queryset = Recipe.objects.select_related('author').prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('id', 'slug')),
+            Prefetch('ingredient',
+                     queryset=IngredientAmount.objects.select_related(
+                         'ingredients')),
+        ).order_by('id')
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                return
+            yield from batch
+            last_id = batch[-1].id
+
+    def to_record(self, recipe):
+        return {
+            'author': recipe.author.username if recipe.author else None,
+            'name': recipe.name,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+            'image': recipe.image.name,
+            'tags': [tag.slug for tag in recipe.tags.all()],
+            'ingredients': [
+                {
+                    'name': amount.ingredients.name,
+                    'measurement_unit': amount.ingredients.measurement_unit,
+                    'amount': amount.amount,
+                }
+                for amount in recipe.ingredient.all()
+            ],
+        }
+
+    def write(self, file, format, records):
+        if format == 'ndjson':
+            for record in records:
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        elif format == 'json':
+            separator = '[\n'
+            for record in records:
+                file.write(separator + json.dumps(record, ensure_ascii=False))
+                separator = ',\n'
+            file.write('\n]\n' if separator == ',\n' else '[]\n')
+        else:
+            writer = csv.DictWriter(file, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            for record in records:
+                record['tags'] = '|'.join(record['tags'])
+                record['ingredients'] = json.dumps(
+                    record['ingredients'], ensure_ascii=False)
+                writer.writerow(record)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or (
+            'ndjson' if path == '-' else detect_format(path))
+        if format not in FORMATS:
+            format = 'json'
+        records = map(self.to_record, self.iter_recipes(options['batch_size']))
+        if path == '-':
+            self.write(sys.stdout, format, records)
+            return
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            self.write(file, format, records)
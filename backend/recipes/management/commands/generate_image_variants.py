@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from api.images import executor, process_image, process_in_worker
+from recipes.management.streams import Progress
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Создаёт уменьшенные копии и WebP-версии картинок рецептов, '
+            'для которых их ещё нет, например после import_recipes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Обработать все картинки, а не только без копий.')
+        parser.add_argument(
+            '--parallel', action='store_true',
+            help='Обрабатывать картинки в пуле потоков.')
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(image_variants={})
+        names = list(recipes.order_by().values_list(
+            'image', flat=True).distinct())
+        progress = Progress(self.stdout, 'Картинки')
+        if options['parallel']:
+            for _ in executor.map(process_in_worker, names):
+                progress.update(1, 1)
+            return
+        for name in names:
+            process_image(name)
+            progress.update(1, 1)
@@ -0,0 +1,48 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from api.cache import bump_catalog_version
+from recipes.management.streams import (FORMATS, Checkpoint, Progress,
+                                        batched, iter_records)
+from recipes.models import Ingredient
+
+FIELDNAMES = ('name', 'measurement_unit')
+
+
+class Command(BaseCommand):
+    help = 'Загружает ингредиенты из файла JSON, NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл с позицией последней загруженной записи.')
+
+    def handle(self, *args, **options):
+        checkpoint = Checkpoint(options['checkpoint'])
+        position = checkpoint.load()
+        records = islice(
+            iter_records(options['path'], options['format'], FIELDNAMES),
+            position, None)
+        existing = set(
+            Ingredient.objects.values_list('name', 'measurement_unit'))
+        progress = Progress(self.stdout, 'Ингредиенты')
+        for batch in batched(records, options['batch_size']):
+            ingredients = []
+            for record in batch:
+                key = (record['name'].strip(),
+                       record['measurement_unit'].strip())
+                if key in existing:
+                    continue
+                existing.add(key)
+                ingredients.append(
+                    Ingredient(name=key[0], measurement_unit=key[1]))
+            Ingredient.objects.bulk_create(ingredients, ignore_conflicts=True)
+            position += len(batch)
+            checkpoint.save(position)
+            progress.update(len(batch), len(ingredients))
+        checkpoint.clear()
+        bump_catalog_version(Ingredient)
@@ -0,0 +1,133 @@
+import json
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.cache import bump_catalog_version
+from recipes.counters import change_recipes_count
+from recipes.feed import schedule_fan_out
+from recipes.management.streams import (FORMATS, Checkpoint, Progress,
+                                        batched, iter_records)
+from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
+from recipes.search import schedule_search_update
+
+User = get_user_model()
+
+
+def parse_tags(value):
+    if isinstance(value, str):
+        return [slug for slug in value.split('|') if slug]
+    return value or []
+
+
+def parse_ingredients(value):
+    if isinstance(value, str):
+        return json.loads(value) if value else []
+    return value or []
+
+
+class Command(BaseCommand):
+    help = ('Загружает рецепты из файла JSON, NDJSON или CSV в формате '
+            'команды export_recipes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл с позицией последней загруженной записи.')
+
+    def handle(self, *args, **options):
+        self.authors = dict(User.objects.values_list('username', 'id'))
+        self.tags = dict(Tag.objects.values_list('slug', 'id'))
+        self.ingredients = {
+            (name, measurement_unit): pk
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit')
+        }
+        self.existing = set(Recipe.objects.values_list('author_id', 'name'))
+
+        checkpoint = Checkpoint(options['checkpoint'])
+        position = checkpoint.load()
+        records = islice(
+            iter_records(options['path'], options['format']), position, None)
+        progress = Progress(self.stdout, 'Рецепты')
+        for batch in batched(records, options['batch_size']):
+            created = self.import_batch(batch)
+            position += len(batch)
+            checkpoint.save(position)
+            progress.update(len(batch), created)
+        checkpoint.clear()
+        bump_catalog_version(Recipe)
+
+    def build(self, record):
+        author_id = self.authors.get(record.get('author'))
+        key = (author_id, record.get('name'))
+        if author_id is None or key in self.existing:
+            return None
+        self.existing.add(key)
+        recipe = Recipe(
+            author_id=author_id,
+            name=record['name'],
+            text=record.get('text', ''),
+            cooking_time=int(record.get('cooking_time') or 1),
+            image=record.get('image', ''),
+        )
+        tags = [
+            self.tags[slug] for slug in parse_tags(record.get('tags'))
+            if slug in self.tags
+        ]
+        amounts = {}
+        for item in parse_ingredients(record.get('ingredients')):
+            ingredient_id = self.ingredients.get(
+                (item.get('name'), item.get('measurement_unit')))
+            if ingredient_id is not None:
+                amounts[ingredient_id] = int(item.get('amount') or 1)
+        recipe.ingredients_count = len(amounts)
+        return recipe, tags, amounts
+
+    def import_batch(self, batch):
+        built = [item for item in map(self.build, batch) if item]
+        if not built:
+            return 0
+        recipes = [recipe for recipe, _, _ in built]
+        with transaction.atomic():
+            Recipe.objects.bulk_create(recipes)
+            if recipes[0].pk is None:
+                ids = {
+                    (author_id, name): pk
+                    for pk, author_id, name in Recipe.objects.filter(
+                        author_id__in={r.author_id for r in recipes},
+                        name__in={r.name for r in recipes},
+                    ).values_list('id', 'author_id', 'name')
+                }
+                for recipe in recipes:
+                    recipe.pk = ids[(recipe.author_id, recipe.name)]
+            Recipe.tags.through.objects.bulk_create(
+                (
+                    Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_id)
+                    for recipe, tags, _ in built
+                    for tag_id in tags
+                ),
+                ignore_conflicts=True,
+            )
+            IngredientAmount.objects.bulk_create(
+                (
+                    IngredientAmount(recipe_id=recipe.pk,
+                                     ingredients_id=ingredient_id,
+                                     amount=amount)
+                    for recipe, _, amounts in built
+                    for ingredient_id, amount in amounts.items()
+                ),
+                ignore_conflicts=True,
+            )
+            for author_id, count in Counter(
+                    recipe.author_id for recipe in recipes).items():
+                change_recipes_count(author_id, count)
+            schedule_search_update(recipe.pk for recipe in recipes)
+            schedule_fan_out(recipe.pk for recipe in recipes)
+        return len(recipes)
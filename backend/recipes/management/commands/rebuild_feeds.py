@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recipes.feed import BATCH_SIZE, rebuild_feeds
+from recipes.management.streams import Progress
+
+
+class Command(BaseCommand):
+    help = ('Пересобирает ленты подписок /api/recipes/feed/ и обрезает '
+            'их до последних рецептов, например после загрузки данных '
+            'в обход API. Можно запускать периодически из cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько подписчиков обрабатывать за одну транзакцию.')
+
+    def handle(self, *args, **options):
+        progress = Progress(self.stdout, 'Подписчики')
+        for count in rebuild_feeds(options['batch_size']):
+            progress.update(count, count)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from recipes.management.streams import Progress
+from recipes.search import BATCH_SIZE, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = ('Пересобирает поисковый индекс рецептов для ?search=: '
+            'tsvector в PostgreSQL или таблицу слов в остальных базах.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько рецептов индексировать за один запрос.')
+
+    def handle(self, *args, **options):
+        progress = Progress(self.stdout, 'Рецепты')
+        for count in rebuild_search_index(options['batch_size']):
+            progress.update(count, count)
@@ -0,0 +1,71 @@
+from functools import reduce
+from operator import or_
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Cart, Favorite, IngredientAmount, Recipe
+from users.models import AuthorStats, Follow
+
+
+def count_subquery(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(total=Count('pk'))
+        .values('total'),
+        output_field=IntegerField(),
+    ), 0)
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает денормализованные счётчики избранного, '
+            'списков покупок и рецептов авторов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать число расхождений.')
+
+    def count_drift(self, queryset, counters):
+        return queryset.annotate(**{
+            f'actual_{field}': expression
+            for field, expression in counters.items()
+        }).filter(reduce(or_, (
+            ~Q(**{field: F(f'actual_{field}')}) for field in counters
+        ))).count()
+
+    def handle(self, *args, **options):
+        recipe_counters = {
+            'favorites_count': count_subquery(Favorite, 'recipe'),
+            'in_carts_count': count_subquery(Cart, 'recipe'),
+            'ingredients_count': count_subquery(IngredientAmount, 'recipe'),
+        }
+        author_counters = {
+            'recipes_count': count_subquery(Recipe, 'author'),
+            'followers_count': count_subquery(Follow, 'author'),
+        }
+        missing = (
+            set(Recipe.objects.exclude(author=None)
+                .values_list('author_id', flat=True).distinct())
+            | set(Follow.objects.values_list('author_id', flat=True)
+                  .distinct())
+        ) - set(AuthorStats.objects.values_list('author_id', flat=True))
+        recipes_drift = self.count_drift(Recipe.objects.all(), recipe_counters)
+        authors_drift = self.count_drift(
+            AuthorStats.objects.all(), author_counters)
+        self.stdout.write(
+            f'Рецептов с расхождениями: {recipes_drift}, '
+            f'авторов с расхождениями: {authors_drift}, '
+            f'авторов без статистики: {len(missing)}')
+        if options['dry_run']:
+            return
+        with transaction.atomic():
+            AuthorStats.objects.bulk_create(
+                (AuthorStats(author_id=author_id) for author_id in missing),
+                ignore_conflicts=True,
+            )
+            Recipe.objects.update(**recipe_counters)
+            AuthorStats.objects.update(**author_counters)
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
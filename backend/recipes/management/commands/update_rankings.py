@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.rankings import HALF_LIFE_HOURS, WINDOW_DAYS, update_rankings
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рейтинг рецептов для сортировки '
+            '?ordering=trending. Запускается периодически, например '
+            'из cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--half-life', type=float, default=HALF_LIFE_HOURS,
+            help='Период полураспада веса добавления, в часах.')
+        parser.add_argument(
+            '--window', type=int, default=WINDOW_DAYS,
+            help='Сколько дней добавлений учитывать.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = update_rankings(options['half_life'], options['window'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Рейтинг пересчитан для {count} рецептов за '
+            f'{time.perf_counter() - start:.2f} с'))
@@ -0,0 +1,120 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+FORMATS = ('json', 'ndjson', 'csv')
+READ_SIZE = 64 * 1024
+
+
+def detect_format(path, format=None):
+    if format:
+        return format
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    return {'jsonl': 'ndjson'}.get(extension, extension)
+
+
+def iter_json_array(file):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    eof = False
+    while True:
+        buffer = buffer.lstrip()
+        if not started:
+            if not buffer and not eof:
+                chunk = file.read(READ_SIZE)
+                eof = not chunk
+                buffer += chunk
+                continue
+            if not buffer.startswith('['):
+                raise ValueError('Ожидается JSON-массив')
+            buffer = buffer[1:]
+            started = True
+            continue
+        buffer = buffer.lstrip(', \t\r\n')
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = file.read(READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        yield item
+
+
+def iter_records(path, format=None, fieldnames=None):
+    format = detect_format(path, format)
+    with open(path, encoding='utf-8', newline='') as file:
+        if format == 'json':
+            yield from iter_json_array(file)
+        elif format == 'ndjson':
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        elif format == 'csv':
+            reader = csv.DictReader(file, fieldnames=fieldnames)
+            for row in reader:
+                if fieldnames and list(row.values()) == list(fieldnames):
+                    continue
+                yield row
+        else:
+            raise ValueError(f'Неизвестный формат: {format}')
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        with open(self.path, encoding='utf-8') as file:
+            return int(file.read().strip() or 0)
+
+    def save(self, position):
+        if not self.path:
+            return
+        with open(f'{self.path}.tmp', 'w', encoding='utf-8') as file:
+            file.write(str(position))
+        os.replace(f'{self.path}.tmp', self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Progress:
+    def __init__(self, stdout, label):
+        self.stdout = stdout
+        self.label = label
+        self.started = time.perf_counter()
+        self.processed = 0
+        self.created = 0
+
+    def update(self, processed, created):
+        self.processed += processed
+        self.created += created
+        self.report()
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        rate = self.processed / elapsed if elapsed else 0
+        self.stdout.write(
+            f'{self.label}: обработано {self.processed}, '
+            f'добавлено {self.created}, {rate:.0f} записей/с')
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+
+class PostgresRunSQL(migrations.RunSQL):
+    # Индексы с классами операторов и GIN есть только в PostgreSQL,
+    # в остальных базах миграция ничего не делает.
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(
+                app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(
+                app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        PostgresRunSQL(
+            'CREATE INDEX IF NOT EXISTS ingredient_name_pattern_idx '
+            'ON recipes_ingredient (UPPER(name) text_pattern_ops)',
+            'DROP INDEX IF EXISTS ingredient_name_pattern_idx',
+        ),
+        PostgresRunSQL(
+            'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+            migrations.RunSQL.noop,
+        ),
+        PostgresRunSQL(
+            'CREATE INDEX IF NOT EXISTS ingredient_name_trgm_idx '
+            'ON recipes_ingredient USING gin (UPPER(name) gin_trgm_ops)',
+            'DROP INDEX IF EXISTS ingredient_name_trgm_idx',
+        ),
+        PostgresRunSQL(
+            'CREATE INDEX IF NOT EXISTS recipe_search_vector_idx '
+            'ON recipes_recipe USING gin (search_vector)',
+            'DROP INDEX IF EXISTS recipe_search_vector_idx',
+        ),
+    ]
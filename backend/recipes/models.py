@@ -1,10 +1,34 @@
 from django.contrib.auth import get_user_model
 from django.core import validators
 from django.db import models
+from django.db.models.functions import Upper
+from django.utils import timezone
 
 User = get_user_model()
 
 
+class SearchVectorField(models.Field):
+    # Поле из django.contrib.postgres требует psycopg2, поэтому своё:
+    # в PostgreSQL это tsvector, в остальных базах колонка пустая,
+    # а поиск идёт по таблице SearchTerm.
+    description = 'Поисковый вектор'
+
+    def db_type(self, connection):
+        if connection.vendor == 'postgresql':
+            return 'tsvector'
+        return 'text'
+
+
+@SearchVectorField.register_lookup
+class SearchMatch(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} @@ {rhs}', lhs_params + rhs_params
+
+
 class Tag(models.Model):
     name = models.CharField(
         verbose_name='Название', max_length=200, unique=True)
@@ -35,11 +59,20 @@ class Ingredient(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['name', 'measurement_unit'],
                                     name='unique_for_ingredient')]
+        indexes = [
+            models.Index(Upper('name'), name='ingredient_name_upper_idx'),
+        ]
 
     def __str__(self) -> str:
         return f'{self.name}'
 
 
+class RecipeManager(models.Manager):
+    def get_queryset(self):
+        # Поисковый вектор нужен только в условиях и сортировке запросов.
+        return super().get_queryset().defer('search_vector')
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -52,6 +85,8 @@ class Recipe(models.Model):
         verbose_name='Название', max_length=200)
     image = models.ImageField(
         verbose_name='Картинка', upload_to='recipe_images/')
+    image_variants = models.JSONField(
+        verbose_name='Уменьшенные копии картинки', default=dict, blank=True)
     text = models.TextField(
         verbose_name='Текстовое описание')
     ingredients = models.ManyToManyField(
@@ -70,11 +105,30 @@ class Recipe(models.Model):
     )
     pub_date = models.DateTimeField(
         verbose_name='Дата публикации', auto_now_add=True)
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Число добавлений в избранное', default=0)
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='Число добавлений в список покупок', default=0)
+    ingredients_count = models.PositiveSmallIntegerField(
+        verbose_name='Число ингредиентов', default=0)
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор', null=True, editable=False)
+
+    objects = RecipeManager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date', )
+        indexes = [
+            models.Index(fields=['-pub_date'], name='recipe_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date'],
+                         name='recipe_author_pub_date_idx'),
+            models.Index(fields=['-favorites_count', '-pub_date'],
+                         name='recipe_popular_idx'),
+            models.Index(fields=['cooking_time', '-pub_date'],
+                         name='recipe_cooking_time_idx'),
+        ]
 
     def __str__(self) -> str:
         return f'{self.name}'
@@ -110,6 +164,10 @@ class IngredientAmount(models.Model):
             models.UniqueConstraint(fields=['recipe', 'ingredients'],
                                     name='unique_ingredients_recipe')
         ]
+        indexes = [
+            models.Index(fields=['ingredients', 'recipe'],
+                         name='amount_ingredient_recipe_idx'),
+        ]
 
     def __str__(self) -> str:
         return f'{self.ingredients.name} - {self.amount}'
@@ -128,7 +186,8 @@ class Cart(models.Model):
         related_name='cart',
         verbose_name='Рецепт',
     )
-    
+    added = models.DateTimeField(
+        verbose_name='Дата добавления', default=timezone.now, db_index=True)
 
     class Meta:
         ordering = ['-id']
@@ -153,6 +212,8 @@ class Favorite(models.Model):
         related_name='favorites',
         verbose_name='Рецепт',
     )
+    added = models.DateTimeField(
+        verbose_name='Дата добавления', default=timezone.now, db_index=True)
 
     class Meta:
         ordering = ['-id']
@@ -165,3 +226,77 @@ class Favorite(models.Model):
 
     def __str__(self):
         return f'{self.user}'
+
+
+class SearchTerm(models.Model):
+    term = models.CharField(verbose_name='Слово', max_length=50)
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Рецепт',
+    )
+    weight = models.PositiveSmallIntegerField(verbose_name='Вес', default=1)
+
+    class Meta:
+        verbose_name = 'Слово поискового индекса'
+        verbose_name_plural = 'Поисковый индекс'
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'recipe'],
+                                    name='unique_search_term')
+        ]
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'recipe'],
+                                    name='unique_feed_entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-recipe'],
+                         name='feed_user_pub_date_idx'),
+        ]
+
+
+class RecipeRanking(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+        verbose_name='Рецепт',
+    )
+    score = models.FloatField(
+        verbose_name='Рейтинг за последнее время', default=0)
+    updated = models.DateTimeField(
+        verbose_name='Дата пересчёта', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+        indexes = [
+            models.Index(fields=['-score'], name='ranking_score_idx'),
+        ]
@@ -0,0 +1,30 @@
+from django.db.models import (Count, ExpressionWrapper, F, FloatField, Max,
+                              Value)
+from django.db.models.functions import Greatest
+
+from recipes.models import IngredientAmount
+
+PANTRY_LIMIT = 100
+
+
+def match_recipes(ingredients, max_missing=None):
+    # Считаются только строки IngredientAmount с ингредиентами
+    # пользователя (индекс ingredients, recipe), а общее число
+    # ингредиентов рецепта берётся из Recipe.ingredients_count.
+    matches = (
+        IngredientAmount.objects.filter(ingredients_id__in=ingredients)
+        .order_by().values('recipe_id')
+        .annotate(
+            matched=Count('id'),
+            total=Greatest(Max('recipe__ingredients_count'), Count('id')),
+        )
+        .annotate(
+            missing=F('total') - F('matched'),
+            coverage=ExpressionWrapper(
+                F('matched') * Value(1.0) / F('total'),
+                output_field=FloatField()),
+        )
+    )
+    if max_missing is not None:
+        matches = matches.filter(missing__lte=max_missing)
+    return matches.order_by('-coverage', 'missing', '-recipe_id')
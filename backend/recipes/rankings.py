@@ -0,0 +1,47 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from recipes.models import Cart, Favorite, RecipeRanking
+
+HALF_LIFE_HOURS = 72
+WINDOW_DAYS = 30
+WEIGHTS = (
+    (Favorite, 1.0),
+    (Cart, 0.5),
+)
+BATCH_SIZE = 1000
+
+
+def compute_trending_scores(half_life=HALF_LIFE_HOURS, window=WINDOW_DAYS):
+    now = timezone.now()
+    since = now - timedelta(days=window)
+    scores = defaultdict(float)
+    for model, weight in WEIGHTS:
+        rows = (
+            model.objects.filter(added__gte=since)
+            .annotate(hour=TruncHour('added'))
+            .values_list('recipe_id', 'hour')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        for recipe_id, hour, total in rows.iterator():
+            age = (now - hour).total_seconds() / 3600
+            scores[recipe_id] += weight * total * 0.5 ** (age / half_life)
+    return scores
+
+
+def update_rankings(half_life=HALF_LIFE_HOURS, window=WINDOW_DAYS):
+    scores = compute_trending_scores(half_life, window)
+    with transaction.atomic():
+        RecipeRanking.objects.all().delete()
+        RecipeRanking.objects.bulk_create(
+            (RecipeRanking(recipe_id=recipe_id, score=score)
+             for recipe_id, score in scores.items()),
+            batch_size=BATCH_SIZE,
+        )
+    return len(scores)
@@ -0,0 +1,142 @@
+import re
+from collections import Counter, defaultdict
+from functools import reduce
+from operator import add
+
+from django.db import connections, router, transaction
+from django.db.models import (Count, F, OuterRef, Subquery, Sum, TextField,
+                              Value)
+from django.db.models.functions import Coalesce
+
+from recipes.models import IngredientAmount, Recipe, SearchTerm
+
+SEARCH_CONFIG = 'russian'
+MAX_TERMS = 10
+BATCH_SIZE = 1000
+# Вес поля: буква — для ts_rank в PostgreSQL, число — для таблицы
+# SearchTerm в остальных базах.
+WEIGHTS = {
+    'name': ('A', 4),
+    'ingredients': ('B', 2),
+    'text': ('D', 1),
+}
+TOKEN_RE = re.compile(r'\w{2,}')
+TERM_LENGTH = SearchTerm._meta.get_field('term').max_length
+
+
+def tokenize(text):
+    return [
+        token[:TERM_LENGTH]
+        for token in TOKEN_RE.findall(text.casefold().replace('ё', 'е'))
+    ]
+
+
+def is_postgres():
+    return connections[router.db_for_write(Recipe)].vendor == 'postgresql'
+
+
+def update_search_vectors(recipe_ids):
+    # django.contrib.postgres импортирует psycopg2, нужный только PostgreSQL.
+    from django.contrib.postgres.aggregates import StringAgg
+    from django.contrib.postgres.search import SearchVector
+
+    ingredients = Coalesce(Subquery(
+        IngredientAmount.objects.filter(recipe=OuterRef('pk')).order_by()
+        .values('recipe')
+        .annotate(names=StringAgg('ingredients__name', ' '))
+        .values('names')
+    ), Value(''), output_field=TextField())
+    fields = {
+        'name': F('name'),
+        'ingredients': ingredients,
+        'text': F('text'),
+    }
+    vector = reduce(add, (
+        SearchVector(expression, weight=WEIGHTS[field][0],
+                     config=SEARCH_CONFIG)
+        for field, expression in fields.items()
+    ))
+    Recipe.objects.filter(id__in=recipe_ids).update(search_vector=vector)
+
+
+def update_search_terms(recipe_ids):
+    ingredients = defaultdict(list)
+    for recipe_id, name in IngredientAmount.objects.filter(
+            recipe_id__in=recipe_ids).values_list(
+                'recipe_id', 'ingredients__name'):
+        ingredients[recipe_id].append(name)
+    terms = []
+    for recipe_id, name, text in Recipe.objects.filter(
+            id__in=recipe_ids).values_list('id', 'name', 'text'):
+        fields = {
+            'name': name,
+            'ingredients': ' '.join(ingredients[recipe_id]),
+            'text': text,
+        }
+        weights = Counter()
+        for field, value in fields.items():
+            for term in set(tokenize(value)):
+                weights[term] += WEIGHTS[field][1]
+        terms.extend(
+            SearchTerm(term=term, recipe_id=recipe_id, weight=weight)
+            for term, weight in weights.items()
+        )
+    with transaction.atomic():
+        SearchTerm.objects.filter(recipe_id__in=recipe_ids).delete()
+        SearchTerm.objects.bulk_create(terms, batch_size=BATCH_SIZE)
+
+
+def update_search_index(recipe_ids):
+    update = update_search_vectors if is_postgres() else update_search_terms
+    recipe_ids = list(recipe_ids)
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        update(recipe_ids[start:start + BATCH_SIZE])
+
+
+def schedule_search_update(recipe_ids):
+    # Ингредиенты рецепта сохраняются после него самого, поэтому
+    # индекс обновляется после коммита транзакции.
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        transaction.on_commit(lambda: update_search_index(recipe_ids))
+
+
+def rebuild_search_index(batch_size=BATCH_SIZE):
+    last_id = 0
+    while True:
+        recipe_ids = list(
+            Recipe.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', flat=True)[:batch_size])
+        if not recipe_ids:
+            return
+        update_search_index(recipe_ids)
+        last_id = recipe_ids[-1]
+        yield len(recipe_ids)
+
+
+def search_recipes(queryset, query):
+    if is_postgres():
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type='websearch')
+        queryset = queryset.filter(search_vector__match=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query))
+    else:
+        terms = list(dict.fromkeys(tokenize(query)))[:MAX_TERMS]
+        if not terms:
+            return queryset.none()
+        # Рецепт должен содержать все слова запроса; ранг — сумма весов
+        # полей, в которых они встречаются.
+        matches = SearchTerm.objects.filter(term__in=terms).order_by()
+        recipe_ids = (
+            matches.values('recipe_id').annotate(matched=Count('id'))
+            .filter(matched=len(terms)).values('recipe_id')
+        )
+        rank = (
+            matches.filter(recipe_id=OuterRef('pk')).values('recipe_id')
+            .annotate(rank=Sum('weight')).values('rank')
+        )
+        queryset = queryset.filter(id__in=recipe_ids).annotate(
+            search_rank=Subquery(rank))
+    return queryset.order_by('-search_rank', '-pub_date', '-id')
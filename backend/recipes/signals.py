@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from recipes.feed import schedule_fan_out
+from recipes.models import Ingredient, Recipe
+from recipes.search import schedule_search_update
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        schedule_fan_out([instance.pk])
+
+
+@receiver(post_save, sender=Ingredient)
+def update_ingredient_search(sender, instance, created, **kwargs):
+    if not created:
+        schedule_search_update(instance.recipes.values_list('id', flat=True))
+
@@ -0,0 +1,40 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from benchmarks.api_queries import create_data, scenarios
+
+# Число запросов не должно зависеть от размера страницы.
+QUERIES = {
+    'list': 5,
+    'list_anonymous': 4,
+    'list_filtered': 6,
+    'detail': 5,
+    'detail_anonymous': 4,
+    'users': 3,
+    'users_anonymous': 2,
+    'users_me': 1,
+    'subscriptions': 3,
+    'subscriptions_limited': 3,
+}
+PAGE_SIZES = (1, 24)
+
+
+@pytest.fixture
+def reader(db, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return create_data(max(PAGE_SIZES) * 2)
+
+
+@pytest.mark.parametrize('size', PAGE_SIZES)
+@pytest.mark.parametrize('name', QUERIES)
+def test_query_count(reader, django_assert_num_queries, name, size):
+    user, url = scenarios(reader)[name]
+    client = APIClient()
+    if user:
+        client.force_authenticate(user)
+    # Кеш страниц и счётчиков очищается, чтобы считать запросы к базе.
+    cache.clear()
+    with django_assert_num_queries(QUERIES[name]):
+        response = client.get(url.format(size=size))
+    assert response.status_code == 200, response.content
@@ -28,3 +28,21 @@ class Follow(models.Model):
                 name='unique_follow',
             )
         ]
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Автор',
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Число рецептов', default=0)
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Число подписчиков', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'